@@ -0,0 +1,446 @@
+"""
+In-memory stand-ins for Motor collections and the Pyrogram client, so the
+/start path can be driven without Telegram or MongoDB.
+"""
+import asyncio
+import copy
+import itertools
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+from pyrogram.enums import ChatMemberStatus
+from pyrogram.errors import UserNotParticipant
+
+from metrics import record_api_time
+from ratelimit import call_timeout
+
+_MISSING = object()
+
+
+# ==================== MONGO FAKES ====================
+
+def _get_path(doc, path: str):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return _MISSING
+        doc = doc[part]
+    return doc
+
+
+def _set_path(doc, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc, path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _compare(value, op: str, arg) -> bool:
+    values = value if isinstance(value, list) else [value]
+    if op == "$in":
+        return any(v in arg for v in values)
+    if op == "$nin":
+        return not any(v in arg for v in values)
+    if op == "$ne":
+        return arg not in values
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if value is _MISSING or value is None:
+        return False
+    if op == "$gt":
+        return value > arg
+    if op == "$gte":
+        return value >= arg
+    if op == "$lt":
+        return value < arg
+    if op == "$lte":
+        return value <= arg
+    raise NotImplementedError(f"query operator {op}")
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = _get_path(doc, key)
+        if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            if not all(_compare(value, op, arg) for op, arg in cond.items()):
+                return False
+        elif isinstance(value, list) and not isinstance(cond, list):
+            if cond not in value:
+                return False
+        elif value is _MISSING:
+            if cond is not None:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _project(doc: dict, projection) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include or list(projection.items()) == [("_id", 1)]:
+        result = {k: copy.deepcopy(doc[k]) for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {k: copy.deepcopy(v) for k, v in doc.items() if projection.get(k, 1)}
+
+
+class FakeCursor:
+    def __init__(self, collection, query, projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction=1):
+        self._sort = key if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    async def _results(self) -> list:
+        await self._collection._io("find")
+        docs = [doc for doc in self._collection.docs if matches(doc, self._query)]
+        for key, direction in reversed(self._sort):
+            docs.sort(key=lambda doc: (_get_path(doc, key) is _MISSING, _get_path(doc, key)), reverse=direction < 0)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(doc, self._projection) for doc in docs]
+
+    async def to_list(self, length=None):
+        docs = await self._results()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        async def iterate():
+            for doc in await self._results():
+                yield doc
+        return iterate()
+
+
+class FakeCollection:
+    """The subset of AsyncIOMotorCollection used by Master, with a simulated round-trip."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str, latency: float = 0.0, ops: Counter = None):
+        self.name = name
+        self.latency = latency
+        self.docs = []
+        self.ops = ops if ops is not None else Counter()
+
+    async def _io(self, op: str):
+        self.ops[f"{self.name}.{op}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _first(self, query):
+        return next((doc for doc in self.docs if matches(doc, query)), None)
+
+    def _apply(self, doc: dict, update: dict, inserting: bool = False):
+        for op, fields in update.items():
+            if op == "$setOnInsert" and not inserting:
+                continue
+            for path, arg in fields.items():
+                if op in ("$set", "$setOnInsert"):
+                    _set_path(doc, path, copy.deepcopy(arg))
+                elif op == "$unset":
+                    _unset_path(doc, path)
+                elif op == "$inc":
+                    current = _get_path(doc, path)
+                    _set_path(doc, path, (0 if current is _MISSING else current) + arg)
+                elif op in ("$addToSet", "$push"):
+                    current = _get_path(doc, path)
+                    items = arg["$each"] if isinstance(arg, dict) and "$each" in arg else [arg]
+                    current = [] if current is _MISSING else current
+                    for item in items:
+                        if op == "$push" or item not in current:
+                            current.append(item)
+                    _set_path(doc, path, current)
+                elif op == "$pull":
+                    current = _get_path(doc, path)
+                    if current is not _MISSING:
+                        _set_path(doc, path, [item for item in current if item != arg])
+                else:
+                    raise NotImplementedError(f"update operator {op}")
+
+    def _upsert_doc(self, query: dict, update: dict) -> dict:
+        doc = {k: copy.deepcopy(v) for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        self._apply(doc, update, inserting=True)
+        doc.setdefault("_id", next(self._ids))
+        self.docs.append(doc)
+        return doc
+
+    async def find_one(self, query=None, projection=None, **kwargs):
+        await self._io("find_one")
+        doc = self._first(query)
+        return _project(doc, projection) if doc is not None else None
+
+    def find(self, query=None, projection=None, **kwargs):
+        return FakeCursor(self, query, projection)
+
+    async def count_documents(self, query=None, **kwargs):
+        await self._io("count_documents")
+        return sum(1 for doc in self.docs if matches(doc, query))
+
+    async def estimated_document_count(self, **kwargs):
+        await self._io("estimated_document_count")
+        return len(self.docs)
+
+    async def insert_one(self, doc: dict, **kwargs):
+        await self._io("insert_one")
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", next(self._ids))
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"], acknowledged=True)
+
+    async def insert_many(self, docs: list, **kwargs):
+        await self._io("insert_many")
+        inserted = []
+        for doc in docs:
+            doc = copy.deepcopy(doc)
+            doc.setdefault("_id", next(self._ids))
+            self.docs.append(doc)
+            inserted.append(doc["_id"])
+        return SimpleNamespace(inserted_ids=inserted, acknowledged=True)
+
+    async def update_one(self, query, update, upsert=False, **kwargs):
+        await self._io("update_one")
+        doc = self._first(query)
+        if doc is not None:
+            self._apply(doc, update)
+            return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            doc = self._upsert_doc(query, update)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def update_many(self, query, update, upsert=False, **kwargs):
+        await self._io("update_many")
+        docs = [doc for doc in self.docs if matches(doc, query)]
+        for doc in docs:
+            self._apply(doc, update)
+        if not docs and upsert:
+            doc = self._upsert_doc(query, update)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+        return SimpleNamespace(matched_count=len(docs), modified_count=len(docs), upserted_id=None)
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False, return_document=False, **kwargs):
+        await self._io("find_one_and_update")
+        doc = self._first(query)
+        if doc is None:
+            if not upsert:
+                return None
+            doc = self._upsert_doc(query, update)
+            return _project(doc, projection) if return_document else None
+        before = _project(doc, projection)
+        self._apply(doc, update)
+        return _project(doc, projection) if return_document else before
+
+    async def replace_one(self, query, replacement, upsert=False, **kwargs):
+        await self._io("replace_one")
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                self.docs[i] = dict(copy.deepcopy(replacement), _id=doc["_id"])
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            doc = dict(copy.deepcopy(replacement))
+            doc.setdefault("_id", next(self._ids))
+            self.docs.append(doc)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def delete_one(self, query, **kwargs):
+        await self._io("delete_one")
+        doc = self._first(query)
+        if doc is not None:
+            self.docs.remove(doc)
+        return SimpleNamespace(deleted_count=int(doc is not None))
+
+    async def delete_many(self, query, **kwargs):
+        await self._io("delete_many")
+        before = len(self.docs)
+        self.docs = [doc for doc in self.docs if not matches(doc, query)]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+    async def create_index(self, keys, **kwargs):
+        return kwargs.get("name", "_".join(f"{k}_{d}" for k, d in keys))
+
+    async def index_information(self):
+        return {"_id_": {"key": [("_id", 1)]}}
+
+
+class FakeDatabase:
+    def __init__(self, latency: float = 0.0, ops: Counter = None):
+        self.latency = latency
+        self.ops = ops if ops is not None else Counter()
+        self.collections = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(name, self.latency, self.ops)
+        return self.collections[name]
+
+    async def command(self, name: str, *args, **kwargs):
+        self.ops[f"command.{name}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return {"ok": 1.0}
+
+
+def install_fake_database(master, latency: float = 0.0) -> FakeDatabase:
+    """Point every collection attribute of a Master instance at in-memory fakes."""
+    import motor.motor_asyncio
+
+    fake = FakeDatabase(latency)
+    for attr, value in list(vars(master).items()):
+        if isinstance(value, motor.motor_asyncio.AsyncIOMotorCollection):
+            setattr(master, attr, fake[value.name])
+    master.database = fake
+    return fake
+
+
+# ==================== TELEGRAM FAKES ====================
+
+class FakeUser(SimpleNamespace):
+    def __init__(self, user_id: int):
+        super().__init__(
+            id=user_id,
+            first_name=f"User{user_id}",
+            last_name=None,
+            username=None,
+            mention=f'<a href="tg://user?id={user_id}">User{user_id}</a>'
+        )
+
+
+class FakeMessage:
+    """Message that records what the handler sent back to the user."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, client, chat_id: int, text: str = "", from_user=None, photo=None, caption=None, reply_markup=None):
+        self._client = client
+        self.id = next(self._ids)
+        self.chat = SimpleNamespace(id=chat_id)
+        self.from_user = from_user
+        self.text = text
+        self.caption = caption
+        self.command = text.split() if text.startswith("/") else None
+        self.photo = SimpleNamespace(file_id=photo) if photo else None
+        self.reply_markup = reply_markup
+        self.replies = []
+
+    async def _reply(self, method: str, **kwargs):
+        await self._client.call(method, self.chat.id)
+        message = FakeMessage(self._client, self.chat.id, **kwargs)
+        self.replies.append(message)
+        return message
+
+    async def reply(self, text, **kwargs):
+        return await self._reply("SendMessage", text=text, reply_markup=kwargs.get("reply_markup"))
+
+    reply_text = reply
+
+    async def reply_photo(self, photo, caption=None, reply_markup=None, **kwargs):
+        file_id = photo if photo.startswith("fake_file_") else f"fake_file_{abs(hash(photo))}"
+        return await self._reply("SendMedia", photo=file_id, caption=caption, reply_markup=reply_markup)
+
+    async def reply_chat_action(self, action):
+        await self._client.call("SetTyping", self.chat.id)
+
+    async def edit(self, text, **kwargs):
+        await self._client.call("EditMessage", self.chat.id)
+        self.text = text
+        return self
+
+    edit_text = edit
+
+    async def delete(self, *args):
+        await self._client.call("DeleteMessages", self.chat.id)
+
+
+class FakeClient:
+    """
+    Pyrogram client stand-in answering every call after a simulated round-trip.
+
+    Each call optionally waits on the bot's ApiGovernor first, like Bot.invoke,
+    and is charged to the handler's API phase.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.2, governor=None, members=None, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.governor = governor
+        self.members = members or set()
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._links = itertools.count(1)
+
+    async def call(self, method: str, chat_key=None):
+        started = asyncio.get_running_loop().time()
+        if self.governor:
+            await self.governor.acquire(method, chat_key)
+        self.calls[method] += 1
+        if self.latency:
+            # Like Bot.invoke, a call deadline covers the round trip only
+            round_trip = asyncio.sleep(self.latency * self._random.uniform(1 - self.jitter, 1 + self.jitter))
+            await asyncio.wait_for(round_trip, call_timeout.get())
+        record_api_time(asyncio.get_running_loop().time() - started)
+
+    async def get_chat_member(self, chat_id: int, user_id: int):
+        await self.call("GetParticipant", chat_id)
+        if (chat_id, user_id) not in self.members:
+            raise UserNotParticipant()
+        return SimpleNamespace(status=ChatMemberStatus.MEMBER, user=FakeUser(user_id))
+
+    async def get_chat(self, chat_id: int):
+        await self.call("GetFullChannel", chat_id)
+        return SimpleNamespace(id=chat_id, title=f"Channel {chat_id}", username=None)
+
+    async def create_chat_invite_link(self, chat_id: int, **kwargs):
+        await self.call("ExportChatInvite", chat_id)
+        return SimpleNamespace(invite_link=f"https://t.me/+fake{next(self._links)}")
+
+    async def revoke_chat_invite_link(self, chat_id: int, invite_link: str):
+        await self.call("EditExportedChatInvite", chat_id)
+
+    async def delete_messages(self, chat_id: int, message_ids):
+        await self.call("DeleteMessages", chat_id)
+
+    async def send_photo(self, chat_id: int, photo, **kwargs):
+        await self.call("SendMedia", chat_id)
+        return FakeMessage(self, chat_id, photo=f"fake_file_{abs(hash(photo))}")
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        await self.call("SendMessage", chat_id)
+        return FakeMessage(self, chat_id, text=text)
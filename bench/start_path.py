@@ -0,0 +1,200 @@
+"""
+Offline benchmark of the /start deep-link path.
+
+Drives start_command (and through it check_fsub and not_joined) for N
+simulated users across M force-subscribe channels, against a fake client
+with configurable Telegram latency and in-memory Mongo collections, then
+prints and optionally writes a JSON report.
+
+    python -m bench.start_path --users 500 --channels 4 --concurrency 100 --output report.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Never let the import of database.database touch a real cluster
+os.environ["DB_URI"] = "mongodb://127.0.0.1:1"
+os.environ.setdefault("DB_NAME", "bench")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fakes import FakeClient, FakeMessage, FakeUser, install_fake_database  # noqa: E402
+
+FSUB_CHANNEL_BASE = -1001000000000
+LINK_CHANNEL_BASE = -1002000000000
+USER_BASE = 10_000_000
+
+
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "p50": round(pick(0.50), 2),
+        "p90": round(pick(0.90), 2),
+        "p95": round(pick(0.95), 2),
+        "p99": round(pick(0.99), 2),
+        "max": round(ordered[-1] * 1000, 2),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 2),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def classify(message: FakeMessage) -> str:
+    """What the user ended up seeing."""
+    texts = [reply.text or reply.caption or "" for reply in message.replies]
+    if any("ʜᴇʀᴇ ɪs ʏᴏᴜʀ ʟɪɴᴋ" in text for text in texts):
+        return "link"
+    if any("Yᴏᴜ Bᴀᴋᴋᴀᴀ" in text for text in texts):
+        return "fsub_prompt"
+    if any(reply.photo for reply in message.replies):
+        return "start"
+    return "error"
+
+
+async def run(args) -> dict:
+    from database.database import Seishiro
+    from helper_func import encode
+    from metrics import PERF, PHASES
+    from plugins.start import start_command
+    from bot import api_governor
+
+    fake_db = install_fake_database(Seishiro, latency=args.db_latency)
+    # As at bot startup: admin and ban checks come from memory
+    await Seishiro.load_access_lists()
+
+    fsub_channels = [FSUB_CHANNEL_BASE - i for i in range(args.channels)]
+    link_channels = [LINK_CHANNEL_BASE - i for i in range(args.link_channels)]
+    for channel_id in fsub_channels:
+        await Seishiro.add_fsub_channel(channel_id)
+        if args.request_mode:
+            await Seishiro.set_channel_mode(channel_id, "on")
+    for channel_id in link_channels:
+        await Seishiro.save_channel(channel_id)
+
+    users = [USER_BASE + i for i in range(args.users)]
+    # Deterministic membership: the first member_ratio share of users joined everything
+    joined = users[:int(len(users) * args.member_ratio)]
+    members = {(channel_id, user_id) for user_id in joined for channel_id in fsub_channels}
+
+    client = FakeClient(
+        latency=args.api_latency,
+        jitter=args.jitter,
+        governor=None if args.no_governor else api_governor,
+        members=members,
+        seed=args.seed
+    )
+    fake_db.ops.clear()
+
+    payloads = [await encode(str(channel_id)) for channel_id in link_channels]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, outcomes, failures = [], {}, 0
+
+    async def one_user(index: int, user_id: int):
+        nonlocal failures
+        payload = payloads[index % len(payloads)]
+        if args.request_links:
+            payload = f"req_{payload}"
+        text = f"/start {payload}" if args.deep_link else "/start"
+        message = FakeMessage(client, user_id, text=text, from_user=FakeUser(user_id))
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await start_command(client, message)
+            except Exception as e:
+                failures += 1
+                logging.getLogger(__name__).error(f"start_command raised for {user_id}: {e}")
+            latencies.append(time.perf_counter() - started)
+        outcome = classify(message)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one_user(i, user_id) for i, user_id in enumerate(users)))
+    wall = time.perf_counter() - wall_started
+
+    phases = {
+        name: {phase: {q: round(histograms[phase].percentile(v) * 1000, 2)
+                       for q, v in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+               for phase in PHASES}
+        for name, histograms in PERF.items() if histograms["total"].count
+    }
+
+    return {
+        "benchmark": "start_path",
+        "revision": git_revision(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "params": vars(args),
+        "results": {
+            "users": len(users),
+            "wall_seconds": round(wall, 3),
+            "throughput_per_second": round(len(users) / wall, 2) if wall else None,
+            "handler_exceptions": failures,
+            "outcomes": outcomes,
+            "latency_ms": percentiles(latencies),
+            "phases_ms": phases,
+            "api_calls": dict(client.calls),
+            "db_ops": dict(fake_db.ops),
+        },
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="simulated users, one /start each")
+    parser.add_argument("--channels", type=int, default=4, help="force-subscribe channels")
+    parser.add_argument("--link-channels", type=int, default=1, help="channels the deep links point to")
+    parser.add_argument("--concurrency", type=int, default=50, help="users in flight at once")
+    parser.add_argument("--member-ratio", type=float, default=1.0, help="share of users that joined every fsub channel")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="seconds per Telegram call")
+    parser.add_argument("--jitter", type=float, default=0.2, help="relative jitter on API latency")
+    parser.add_argument("--db-latency", type=float, default=0.002, help="seconds per Mongo operation")
+    parser.add_argument("--request-mode", action="store_true", help="put fsub channels in join-request mode")
+    parser.add_argument("--request-links", action="store_true", help="use req_ deep links")
+    parser.add_argument("--no-deep-link", dest="deep_link", action="store_false", help="plain /start instead")
+    parser.add_argument("--no-governor", action="store_true", help="bypass the API rate governor")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(_main(args))
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+async def _main(args) -> dict:
+    # config.py installs its own handlers at import; quiet them for the run
+    import config  # noqa: F401
+    logging.getLogger().setLevel(args.log_level)
+    return await run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,44 @@
 import asyncio
+import math
 import sys
+import time
 from datetime import datetime
 from pyrogram import Client
+from pyrogram.errors import FloodWait
 from pyrogram.enums import ParseMode
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from config import *
 from plugins import web_server
+from database.database import Seishiro
+from plugins.invite_pool import fsub_link_pool, primary_link_registry
+from plugins.scheduler import scheduler
+from plugins.media import media_registry
+from ratelimit import ApiGovernor, FloodHold, parse_rates, call_timeout
+from metrics import CallbackMetric, TELEGRAM_LATENCY, TELEGRAM_ERRORS, record_api_time
 import pyrogram.utils
 from aiohttp import web
 
 pyrogram.utils.MIN_CHANNEL_ID = -1002449417637
 
+# Every outbound Telegram call goes through this governor, see Bot.invoke
+api_governor = ApiGovernor(
+    global_rate=API_GLOBAL_RATE,
+    method_rates=parse_rates(API_METHOD_RATES),
+    chat_rate=API_PER_CHAT_RATE,
+    chat_burst=API_PER_CHAT_BURST,
+    call_rate=API_CALL_RATE,
+    bulk_rate=API_BULK_RATE,
+    flood_global_pause=FLOOD_GLOBAL_PAUSE,
+    max_hold_wait=FLOOD_SLEEP_THRESHOLD
+)
+
+CallbackMetric("linkshare_telegram_flood_waits_total", "FloodWait errors received", ["method"],
+               lambda: dict(api_governor.flood_waits), "counter")
+CallbackMetric("linkshare_telegram_flood_wait_seconds_total", "Seconds of FloodWait imposed", ["method"],
+               lambda: dict(api_governor.flood_wait_seconds), "counter")
+CallbackMetric("linkshare_telegram_queue_wait_seconds_total", "Seconds spent waiting in the rate governor", ["method"],
+               lambda: dict(api_governor.wait_seconds), "counter")
+
 name = """
 Link share bot started ✨ Credit:- @Lord_Vasudev_Krishna
 """
@@ -24,44 +52,148 @@ class Bot(Client):
             plugins={"root": "plugins"},
             workers=TG_BOT_WORKERS,
             bot_token=TG_BOT_TOKEN,
+            # FloodWaits are handled by api_governor instead of pyrogram's silent sleep
+            sleep_threshold=0,
         )
         self.LOGGER = LOGGER
+        self.started = False
+        self.indexes_ready = False
+        # Long-running background tasks, kept referenced until stop()
+        self.background_tasks = set()
 
     async def start(self, *args, **kwargs):
+        # Bind the web server first so liveness is reported while connecting;
+        # /readyz stays 503 until start() has finished
+        try:
+            app = web.AppRunner(await web_server(self))
+            await app.setup()
+            bind_address = "0.0.0.0"
+            await web.TCPSite(app, bind_address, PORT).start()
+            self.LOGGER(__name__).info(f"Web server started on {bind_address}:{PORT}")
+        except Exception as e:
+            self.LOGGER(__name__).error(f"Failed to start web server: {e}")
+
         await super().start()
         usr_bot_me = await self.get_me()
+
+        try:
+            await Seishiro.ensure_indexes()
+            self.indexes_ready = True
+        except Exception as e:
+            self.LOGGER(__name__).error(f"Index bootstrap failed: {e}")
+
+        # Independent of the indexes, so one failing never skips the other
+        try:
+            await Seishiro.migrate_join_requests()
+        except Exception as e:
+            self.LOGGER(__name__).error(f"Join request migration failed: {e}")
         self.uptime = datetime.now()
 
+        # Admin and ban checks are answered from these sets from here on
+        await Seishiro.load_access_lists()
+
+        # Photo file_ids uploaded and primary invite links resolved by earlier runs
+        await media_registry.load()
+        await primary_link_registry.load()
+
         # Notify bot restart
         try:
-            await self.send_photo(
+            await media_registry.send(RESTART_PIC, lambda photo: self.send_photo(
                     chat_id=DATABASE_CHANNEL,
-                    photo="https://ibb.co/DH3N4Lyr",
+                    photo=photo,
                     caption=(
                         "**I ʀᴇsᴛᴀʀᴛᴇᴅ ᴀɢᴀɪɴ !**"),
                     reply_markup=InlineKeyboardMarkup(
                         [[InlineKeyboardButton("ᴜᴘᴅᴀᴛᴇs", url="https://t.me/RexBots_Official")]]
                     )
-                )
+                ))
         except Exception as e:
             self.LOGGER(__name__).warning(f"Failed to send bot start message in {DATABASE_CHANNEL}: {e}")
 
+        # Upload any configured photo that has no file_id yet
+        self.spawn(media_registry.warm(self), "media warm-up")
+
+        # Shared fsub join links, rotated in the background
+        self.spawn(fsub_link_pool.run(self), "invite link pool")
+
+        # Delayed deletes and revocations, including those overdue from before the restart
+        self.spawn(scheduler.run(self), "job scheduler")
+
+        # Pick up admin and ban edits made directly in the database
+        self.spawn(self.reconcile_access_lists(), "access list reconcile")
+
         self.set_parse_mode(ParseMode.HTML)
+
+        # Pick up broadcasts interrupted by the last restart
+        from plugins.broadcast import resume_broadcasts
+        self.spawn(resume_broadcasts(self), "broadcast resume")
         self.LOGGER(__name__).info("Wew...Bot is running...⚡  Credit:- @RexBots_Official")
         self.LOGGER(__name__).info(f"{name}")
         self.username = usr_bot_me.username
+        self.started = True
+
+    def spawn(self, coro, name: str) -> asyncio.Task:
+        """Run coro in the background, logging its failure instead of losing it."""
+        task = asyncio.create_task(coro, name=name)
+        self.background_tasks.add(task)
+        task.add_done_callback(self._background_task_done)
+        return task
+
+    def _background_task_done(self, task: asyncio.Task):
+        self.background_tasks.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error:
+            self.LOGGER(__name__).error("Background task %s failed: %r", task.get_name(), error, exc_info=error)
 
-        # Web-response
+    async def reconcile_access_lists(self):
+        while True:
+            await asyncio.sleep(ACCESS_RECONCILE_INTERVAL)
+            await Seishiro.load_access_lists()
+
+    async def invoke(self, query, *args, **kwargs):
+        method = type(query).__name__
+        peer = getattr(query, "peer", None) or getattr(query, "channel", None)
+        chat_key = None
+        if peer is not None:
+            chat_key = getattr(peer, "user_id", None) or getattr(peer, "channel_id", None) or getattr(peer, "chat_id", None)
+
+        # Handler API time includes the rate governor wait and retries
+        call_started = time.perf_counter()
+        timeout = call_timeout.get()
         try:
-            app = web.AppRunner(await web_server())
-            await app.setup()
-            bind_address = "0.0.0.0"
-            await web.TCPSite(app, bind_address, PORT).start()
-            self.LOGGER(__name__).info(f"Web server started on {bind_address}:{PORT}")
-        except Exception as e:
-            self.LOGGER(__name__).error(f"Failed to start web server: {e}")
+            for attempt in range(3):
+                try:
+                    await api_governor.acquire(method, chat_key)
+                except FloodHold as e:
+                    # Surface it like the FloodWait Telegram would return
+                    raise FloodWait(value=math.ceil(e.value))
+                started = time.perf_counter()
+                try:
+                    if timeout:
+                        # Only the round trip counts, not the time queued above
+                        return await asyncio.wait_for(super().invoke(query, *args, **kwargs), timeout)
+                    return await super().invoke(query, *args, **kwargs)
+                except FloodWait as e:
+                    TELEGRAM_ERRORS.inc(method, "FloodWait")
+                    api_governor.on_flood_wait(method, e.value, chat_key)
+                    if e.value > FLOOD_SLEEP_THRESHOLD or attempt == 2:
+                        raise
+                    self.LOGGER(__name__).warning(f"FloodWait of {e.value}s on {method}, retrying")
+                except Exception as e:
+                    TELEGRAM_ERRORS.inc(method, type(e).__name__)
+                    raise
+                finally:
+                    TELEGRAM_LATENCY.observe(time.perf_counter() - started, method)
+        finally:
+            record_api_time(time.perf_counter() - call_started)
 
     async def stop(self, *args):
+        tasks = list(self.background_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         await super().stop()
         self.LOGGER(__name__).info("Bot stopped...")
         
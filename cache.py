@@ -0,0 +1,104 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """
+    Collapse concurrent loads of the same key into one.
+
+    The first caller starts loader() in its own task and every caller, the
+    first included, awaits it through a shield. A caller that is cancelled
+    only stops waiting: the load runs to completion for everyone else.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    async def do(self, key, loader):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark as retrieved so a failure nobody waited for is not reported
+            task.exception()
+
+    def __contains__(self, key):
+        return key in self._tasks
+
+
+class TTLCache:
+    """Small in-memory cache with per-entry expiry and an optional size bound."""
+
+    def __init__(self, ttl: float, maxsize: int = 0):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._inflight = SingleFlight()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        if self.maxsize:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    async def get_or_load(self, key, loader, ttl: float = None):
+        """
+        Return the cached value for key, or await loader() to fill it.
+        Concurrent misses for the same key share a single loader() call.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        async def load():
+            value = await loader()
+            self.set(key, value, ttl)
+            return value
+
+        return await self._inflight.do(key, load)
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else default
+
+    def clear(self):
+        self._data.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def __len__(self):
+        return len(self._data)
@@ -1,8 +1,17 @@
 from ast import pattern
 import os
+import atexit
+import queue
 from os import environ
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+
+def _rate(name: str, default: str) -> float:
+    """Read a rate limit setting; a rate of 0 or less would stall every caller."""
+    value = float(os.environ.get(name, default))
+    if value <= 0:
+        raise ValueError(f"{name} must be greater than 0, got {value}")
+    return value
 
 TG_BOT_TOKEN = os.environ.get("TG_BOT_TOKEN", "")
 BOT_USERNAME = 'Link_sharex_vbot'
@@ -19,23 +28,72 @@ START_MSG = os.environ.get("START_MESSAGE", "Hᴇʟʟᴏ {mention} ~\n\n <i><b><
 ABOUT_TXT = os.environ.get("HELP_MESSAGE", "<i><b><blockquote>◈ ᴄʀᴇᴀᴛᴏʀ: <a href=https://t.me/Lord_Vasudev_Krishna>𝚂𝚑𝚛𝚎𝚎 ꪎ 𝙺ʀɪ𝚜ʜɴᴀ ჯ ↝ 🍷</a>\n◈ ꜰᴏᴜɴᴅᴇʀ ᴏꜰ : <a href=https://t.me/SECRECT_BOT_UPDATES>Sᴇᴄʀᴇᴄᴛ 𝐁ᴏᴛ 𝐔ᴘᴅᴀᴛᴇs</a>\n◈ ʜᴇɴᴛᴀɪ Nᴀɢᴀʀɪ: <a href='https://t.me/HENTAI_NAGARI'>ʜᴇɴᴛᴀɪ Nᴀɢᴀʀɪ</a>\n◈ ᴅᴀᴛᴀʙᴀsᴇ: <a href='https://www.mongodb.com/docs/'>ᴍᴏɴɢᴏ ᴅʙ</a>\n» ᴅᴇᴠᴇʟᴏᴘᴇʀ: <a href='https://t.me/Lord_Vasudev_Krishna'>𝚂𝚑𝚛𝚎𝚎 ꪎ 𝙺ʀɪ𝚜ʜɴᴀ ჯ ↝ 🍷</a></blockquote></b></i>")
 HELP_TXT =  os.environ.get("HELP_MESSAGE", "⁉️ Hᴇʟʟᴏ {mention} ~\n\n <b><blockquote expandable>➪ I ᴀᴍ ᴀ ᴘʀɪᴠᴀᴛᴇ ʟɪɴᴋ sʜᴀʀɪɴɢ ʙᴏᴛ, ᴍᴇᴀɴᴛ ᴛᴏ ᴘʀᴏᴠɪᴅᴇ ʟɪɴᴋ ғᴏʀ sᴘᴇᴄɪғɪᴄ ᴄʜᴀɴɴᴇʟs.\n\n ➪ Iɴ ᴏʀᴅᴇʀ ᴛᴏ ɢᴇᴛ ᴛʜᴇ ʟɪɴᴋs ʏᴏᴜ ʜᴀᴠᴇ ᴛᴏ ᴊᴏɪɴ ᴛʜᴇ ᴀʟʟ ᴍᴇɴᴛɪᴏɴᴇᴅ ᴄʜᴀɴɴᴇʟ ᴛʜᴀᴛ ɪ ᴘʀᴏᴠɪᴅᴇ ʏᴏᴜ ᴛᴏ ᴊᴏɪɴ. Yᴏᴜ ᴄᴀɴ ɴᴏᴛ ᴀᴄᴄᴇss ᴏʀ ɢᴇᴛ ᴛʜᴇ ғɪʟᴇs ᴜɴʟᴇss ʏᴏᴜ ᴊᴏɪɴᴇᴅ ᴀʟʟ ᴄʜᴀɴɴᴇʟs.\n\n ‣ /help - Oᴘᴇɴ ᴛʜɪs ʜᴇʟᴘ ᴍᴇssᴀɢᴇ !</blockquote></b>")
 FSUB_PIC = os.environ.get("FSUB_PIC", "https://files.catbox.moe/xwyuzw.jpg")
+SETTINGS_PIC = os.environ.get("SETTINGS_PIC", "https://files.catbox.moe/i7wwxi.jpg")
+APPROVE_PIC = os.environ.get("APPROVE_PIC", "https://files.catbox.moe/ycogc8.jpg")
+RESTART_PIC = os.environ.get("RESTART_PIC", "https://ibb.co/DH3N4Lyr")
 FSUB_LINK_EXPIRY = 300
+FSUB_LINK_REFRESH_MARGIN = int(os.environ.get("FSUB_LINK_REFRESH_MARGIN", "60"))  # rotate shared fsub links this early
+FSUB_CHECK_CONCURRENCY = int(os.environ.get("FSUB_CHECK_CONCURRENCY", "8"))  # 1 = check channels one by one
+FSUB_CHECK_TIMEOUT = float(os.environ.get("FSUB_CHECK_TIMEOUT", "5"))
+MEMBER_CACHE_TTL = int(os.environ.get("MEMBER_CACHE_TTL", "600"))  # positive verdicts
+MEMBER_CACHE_NEG_TTL = int(os.environ.get("MEMBER_CACHE_NEG_TTL", "5"))  # negative verdicts
+MEMBER_CACHE_SIZE = int(os.environ.get("MEMBER_CACHE_SIZE", "100000"))
+CHAT_CACHE_TTL = int(os.environ.get("CHAT_CACHE_TTL", "3600"))
+CHAT_CACHE_SIZE = int(os.environ.get("CHAT_CACHE_SIZE", "2000"))
+JOIN_REQUEST_TTL = int(os.environ.get("JOIN_REQUEST_TTL", "604800"))  # pending join requests expire after 7 days
+MEMBER_RECORD_TTL = int(os.environ.get("MEMBER_RECORD_TTL", "604800"))  # membership table rows expire after 7 days
+MEMBER_LEAVE_TRUST = int(os.environ.get("MEMBER_LEAVE_TRUST", "60"))  # trust a recorded leave this long before asking Telegram again
+CHANNEL_CACHE_TTL = int(os.environ.get("CHANNEL_CACHE_TTL", "120"))
+BROADCAST_WORKERS = int(os.environ.get("BROADCAST_WORKERS", "20"))
+BROADCAST_RATE = _rate("BROADCAST_RATE", "15")  # messages/s across all workers
+BROADCAST_MAX_RETRIES = int(os.environ.get("BROADCAST_MAX_RETRIES", "3"))
+BROADCAST_BATCH_SIZE = int(os.environ.get("BROADCAST_BATCH_SIZE", "500"))  # users per checkpoint
+BROADCAST_STATUS_INTERVAL = int(os.environ.get("BROADCAST_STATUS_INTERVAL", "15"))
+API_GLOBAL_RATE = _rate("API_GLOBAL_RATE", "30")  # messages sent/s across the bot
+API_CALL_RATE = _rate("API_CALL_RATE", "100")  # every other Telegram call/s (reads, deletes, chat actions)
+API_BULK_RATE = _rate("API_BULK_RATE", "15")  # share of API_GLOBAL_RATE broadcasts may take
+API_METHOD_RATES = os.environ.get("API_METHOD_RATES", "ExportChatInvite:1,EditExportedChatInvite:2,HideChatJoinRequest:10")
+API_PER_CHAT_RATE = _rate("API_PER_CHAT_RATE", "1")
+API_PER_CHAT_BURST = _rate("API_PER_CHAT_BURST", "5")
+FLOOD_SLEEP_THRESHOLD = int(os.environ.get("FLOOD_SLEEP_THRESHOLD", "10"))  # retry FloodWaits up to this long
+FLOOD_GLOBAL_PAUSE = float(os.environ.get("FLOOD_GLOBAL_PAUSE", "5"))
+SCHEDULER_CONCURRENCY = int(os.environ.get("SCHEDULER_CONCURRENCY", "10"))  # scheduled jobs executed at once
+DELETE_BATCH_WINDOW = float(os.environ.get("DELETE_BATCH_WINDOW", "5"))  # coalesce deletions due this close together
+HEALTH_PROBE_TIMEOUT = float(os.environ.get("HEALTH_PROBE_TIMEOUT", "3"))  # per dependency in /readyz
+APPROVE_RATE = _rate("APPROVE_RATE", "8")  # join request approvals/s across all channels
+APPROVE_DELAY = float(os.environ.get("APPROVE_DELAY", "2"))  # let a burst of requests queue up before draining
+APPROVE_BULK_THRESHOLD = int(os.environ.get("APPROVE_BULK_THRESHOLD", "50"))  # approve all pending at once past this backlog
+WELCOME_RATE = _rate("WELCOME_RATE", "3")  # welcome DMs/s after approval
+WELCOME_QUEUE_SIZE = int(os.environ.get("WELCOME_QUEUE_SIZE", "10000"))  # welcome DMs beyond this are dropped
+ACCESS_RECONCILE_INTERVAL = int(os.environ.get("ACCESS_RECONCILE_INTERVAL", "60"))  # reload admin/ban sets to catch edits made outside the bot
 LOG_FILE_NAME = "Rexbots.txt"
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()  # DEBUG enables per-request diagnostics
 DATABASE_CHANNEL = int(os.environ.get("DATABASE_CHANNEL", "-1002771880794"))
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s - %(levelname)s] - %(name)s - %(message)s",
-    datefmt='%d-%b-%y %H:%M:%S',
-    handlers=[
-        RotatingFileHandler(
-            LOG_FILE_NAME,
-            maxBytes=50000000,
-            backupCount=10
-        ),
-        logging.StreamHandler()
-    ]
-)
+# Records are handed to a queue on the event loop thread; file and console
+# writes (and log rotation) happen on the listener's background thread.
+_log_queue = queue.SimpleQueue()
+_log_handlers = [
+    RotatingFileHandler(
+        LOG_FILE_NAME,
+        maxBytes=50000000,
+        backupCount=10
+    ),
+    logging.StreamHandler()
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(logging.Formatter(
+        "[%(asctime)s - %(levelname)s] - %(name)s - %(message)s",
+        datefmt='%d-%b-%y %H:%M:%S'
+    ))
+log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+_queue_handler = QueueHandler(_log_queue)
+# Only merge args into the message here; the listener's handlers add the layout
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.basicConfig(level=LOG_LEVEL, handlers=[_queue_handler])
 logging.getLogger("pyrogram").setLevel(logging.WARNING)
 
 def LOGGER(name: str) -> logging.Logger:
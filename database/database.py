@@ -1,13 +1,34 @@
 import motor.motor_asyncio
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 import base64
 import logging
+import uuid
 from datetime import datetime, date
 from typing import List, Optional, Dict
 from config import * 
+from cache import TTLCache
+from metrics import track_db_methods, register_cache
 
 logging.basicConfig(level=logging.INFO)
 
+_MISSING = object()
 
+# Fields of a 'channels' document needed by link generation and deep links
+CHANNEL_PROJECTION = {
+    "_id": 0,
+    "channel_id": 1,
+    "encoded_link": 1,
+    "req_encoded_link": 1,
+    "status": 1,
+    "original_link": 1,
+    "current_invite_link": 1,
+    "is_request_link": 1,
+    "invite_link_created_at": 1,
+}
+
+
+@track_db_methods
 class Master:
     def __init__(self, DB_URL, DB_NAME):
         self.dbclient = motor.motor_asyncio.AsyncIOMotorClient(DB_URL)
@@ -21,11 +42,147 @@ class Master:
         self.ban_data = self.database['ban_data']
         self.fsub_data = self.database['fsub']  # For force subscription ONLY
         self.rqst_fsub_data = self.database['request_forcesub']
-        self.rqst_fsub_Channel_data = self.database['request_forcesub_channel']
+        self.rqst_fsub_Channel_data = self.database['request_forcesub_channel']  # Legacy per-channel user_ids arrays
+        self.join_requests_data = self.database['fsub_join_requests']  # One document per pending join request
+        self.members_data = self.database['fsub_members']  # Membership seen in chat member updates
+        self.broadcast_data = self.database['broadcasts']  # Resumable broadcast jobs
+        self.broadcast_dead_data = self.database['broadcast_dead_users']  # One document per (job, dead user)
+        self.scheduled_jobs = self.database['scheduled_jobs']  # Delayed deletes and revocations
+        self.media_data = self.database['media_cache']  # Image URL -> Telegram file_id
+        self.primary_links_data = self.database['primary_invite_links']  # Chat id -> primary invite link
 
         # Main collection reference (for backward compatibility)
         self.col = self.user_data
 
+        # Read-through cache of 'channels' documents keyed by channel_id,
+        # plus an (encoded field, link) -> channel_id index for deep links
+        self.channel_cache = TTLCache(CHANNEL_CACHE_TTL, maxsize=5000)
+        self.channel_link_cache = TTLCache(CHANNEL_CACHE_TTL, maxsize=10000)
+
+        # Active fsub channel IDs, and the in-memory front of 'fsub_members'
+        self.fsub_channels_cache = TTLCache(CHANNEL_CACHE_TTL)
+        # Answer admin and ban checks from memory once load_access_lists has run
+        self.admin_ids = set()
+        self.banned_ids = set()
+        self.access_loaded = False
+        self._access_writes = 0
+        self.member_index = TTLCache(MEMBER_RECORD_TTL, maxsize=MEMBER_CACHE_SIZE)
+
+    # ==================== INDEX METHODS ====================
+
+    # (collection attribute, keys, options) for every filter used on a hot path
+    REQUIRED_INDEXES = [
+        ("channel_data", [("channel_id", 1)], {"name": "channel_id_unique", "unique": True}),
+        ("channel_data", [("encoded_link", 1)], {"name": "encoded_link"}),
+        ("channel_data", [("req_encoded_link", 1)], {"name": "req_encoded_link"}),
+        ("channel_data", [("status", 1)], {"name": "status"}),
+        ("fsub_data", [("channel_id", 1)], {"name": "channel_id_unique", "unique": True}),
+        ("fsub_data", [("status", 1)], {"name": "status"}),
+        ("join_requests_data", [("channel_id", 1), ("user_id", 1)], {"name": "channel_id_user_id_unique", "unique": True}),
+        ("join_requests_data", [("requested_at", 1)], {"name": "requested_at_ttl", "expireAfterSeconds": JOIN_REQUEST_TTL}),
+        ("ban_data", [("ban_status.is_banned", 1)], {"name": "is_banned"}),
+        ("members_data", [("channel_id", 1), ("user_id", 1)], {"name": "channel_id_user_id_unique", "unique": True}),
+        ("members_data", [("updated_at", 1)], {"name": "updated_at_ttl", "expireAfterSeconds": MEMBER_RECORD_TTL}),
+        ("broadcast_data", [("status", 1)], {"name": "status"}),
+        ("broadcast_dead_data", [("job_id", 1), ("user_id", 1)], {"name": "job_id_user_id_unique", "unique": True}),
+        ("scheduled_jobs", [("run_at", 1)], {"name": "run_at"}),
+    ]
+
+    # (collection attribute, sample filter) checked with explain() after bootstrap
+    HOT_QUERIES = [
+        ("channel_data", {"channel_id": -1}),
+        ("channel_data", {"encoded_link": "", "status": "active"}),
+        ("channel_data", {"req_encoded_link": "", "status": "active"}),
+        ("fsub_data", {"channel_id": -1, "status": "active"}),
+        ("fsub_data", {"status": "active"}),
+        ("join_requests_data", {"channel_id": -1, "user_id": 0}),
+        ("members_data", {"channel_id": -1, "user_id": 0}),
+    ]
+
+    async def ensure_indexes(self) -> Dict[str, list]:
+        """
+        Create every index in REQUIRED_INDEXES that is missing, then verify
+        that the hot queries no longer fall back to a collection scan.
+
+        An existing index with the same keys is compared on its options too:
+        a changed TTL is applied in place with collMod, while any other
+        difference (e.g. a missing unique flag) is logged as a conflict, since
+        fixing it means dropping the index.
+
+        Returns:
+            dict with 'created', 'existing', 'updated', 'conflicts' and 'failed' index names
+        """
+        report = {"created": [], "existing": [], "updated": [], "conflicts": [], "failed": []}
+        existing_cache = {}
+
+        for attr, keys, options in self.REQUIRED_INDEXES:
+            collection = getattr(self, attr)
+            label = f"{collection.name}.{options['name']}"
+            try:
+                if attr not in existing_cache:
+                    info = await collection.index_information()
+                    existing_cache[attr] = {tuple(map(tuple, index["key"])): index for index in info.values()}
+                current = existing_cache[attr].get(tuple(keys))
+                if current is None:
+                    await collection.create_index(keys, **options)
+                    report["created"].append(label)
+                    continue
+
+                if bool(current.get("unique")) != bool(options.get("unique")):
+                    logging.warning(
+                        f"[INDEX] {label} exists with unique={bool(current.get('unique'))}, "
+                        f"expected unique={bool(options.get('unique'))}; drop it to rebuild"
+                    )
+                    report["conflicts"].append(label)
+                    continue
+
+                ttl = options.get("expireAfterSeconds")
+                if current.get("expireAfterSeconds") != ttl:
+                    if ttl is None:
+                        logging.warning(f"[INDEX] {label} has an unexpected TTL of {current['expireAfterSeconds']}s")
+                        report["conflicts"].append(label)
+                        continue
+                    await self.database.command(
+                        "collMod", collection.name,
+                        index={"keyPattern": dict(keys), "expireAfterSeconds": ttl}
+                    )
+                    logging.info(f"[INDEX] {label} TTL changed from {current.get('expireAfterSeconds')}s to {ttl}s")
+                    report["updated"].append(label)
+                    continue
+
+                report["existing"].append(label)
+            except Exception as e:
+                logging.error(f"[INDEX] Failed to ensure index {label}: {e}")
+                report["failed"].append(label)
+
+        logging.info(f"[INDEX] Created: {report['created'] or 'none'}")
+        logging.info(f"[INDEX] Already present: {report['existing'] or 'none'}")
+        if report["updated"]:
+            logging.info(f"[INDEX] Updated: {report['updated']}")
+        if report["conflicts"]:
+            logging.warning(f"[INDEX] Conflicting: {report['conflicts']}")
+        if report["failed"]:
+            logging.warning(f"[INDEX] Failed: {report['failed']}")
+
+        await self.verify_hot_queries()
+        return report
+
+    async def verify_hot_queries(self) -> List[str]:
+        """Log a warning for every hot query whose winning plan is a COLLSCAN."""
+        scans = []
+        for attr, query in self.HOT_QUERIES:
+            collection = getattr(self, attr)
+            try:
+                plan = await collection.find(query).explain()
+                winning_plan = plan.get("queryPlanner", {}).get("winningPlan", {})
+                if "COLLSCAN" in str(winning_plan):
+                    scans.append(f"{collection.name} {list(query)}")
+            except Exception as e:
+                logging.error(f"[INDEX] Failed to explain query on {collection.name}: {e}")
+        for scan in scans:
+            logging.warning(f"[INDEX] Hot query still uses a collection scan: {scan}")
+        return scans
+
     def new_user(self, id, username=None):
         return dict(
             _id=int(id),
@@ -45,11 +202,11 @@ class Master:
             user = self.new_user(u.id, u.username)
             try:
                 await self.user_data.insert_one(user)
-                logging.info(f"New user added: {u.id}")
+                logging.info("New user added: %s", u.id)
             except Exception as e:
-                logging.error(f"Error adding user {u.id}: {e}")
+                logging.error("Error adding user %s: %s", u.id, e)
         else:
-            logging.info(f"User {u.id} already exists")
+            logging.debug("User %s already exists", u.id)
 
     async def is_user_exist(self, id):
         try:
@@ -81,19 +238,271 @@ class Master:
         except Exception as e:
             logging.error(f"Error deleting user {user_id}: {e}")
 
-    async def is_user_banned(self, user_id):
+    async def delete_users(self, user_ids: List[int]) -> int:
+        """Delete many users in one round trip; returns the number deleted."""
+        if not user_ids:
+            return 0
+        try:
+            result = await self.user_data.delete_many({"_id": {"$in": [int(user_id) for user_id in user_ids]}})
+            return result.deleted_count
+        except Exception as e:
+            logging.error(f"Error deleting {len(user_ids)} users: {e}")
+            return 0
+
+    async def get_users_after(self, last_id=None, limit: int = 500) -> list:
+        """Get the next batch of user IDs in _id order, after last_id."""
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        try:
+            users = await self.user_data.find(query, {"_id": 1}).sort("_id", 1).limit(limit).to_list(limit)
+            return [user["_id"] for user in users]
+        except Exception as e:
+            logging.error(f"Error fetching users after {last_id}: {e}")
+            raise
+
+    # ==================== BROADCAST JOB METHODS ====================
+
+    # Everything a job document holds except the legacy 'dead_users' array
+    BROADCAST_JOB_FIELDS = {
+        field: 1 for field in (
+            "chat_id", "message_id", "admin_chat_id", "status", "last_user_id",
+            "total", "done", "success", "failed", "dead_count", "created_at", "updated_at"
+        )
+    }
+
+    async def create_broadcast_job(self, chat_id: int, message_id: int, admin_chat_id: int, total: int) -> str:
+        """Create a broadcast job and return its ID."""
+        job_id = uuid.uuid4().hex[:8]
+        await self.broadcast_data.insert_one({
+            "_id": job_id,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "admin_chat_id": admin_chat_id,
+            "status": "running",
+            "last_user_id": None,
+            "total": total,
+            "done": 0,
+            "success": 0,
+            "failed": 0,
+            "dead_count": 0,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        })
+        return job_id
+
+    async def get_broadcast_job(self, job_id: str) -> Optional[dict]:
+        return await self.broadcast_data.find_one({"_id": job_id}, self.BROADCAST_JOB_FIELDS)
+
+    async def list_broadcast_jobs(self, statuses: List[str] = None, limit: int = 20) -> list:
+        """List jobs newest first; limit=0 returns all of them."""
+        query = {"status": {"$in": statuses}} if statuses else {}
+        try:
+            cursor = self.broadcast_data.find(query, self.BROADCAST_JOB_FIELDS).sort("created_at", -1)
+            if limit:
+                cursor = cursor.limit(limit)
+            return await cursor.to_list(limit or None)
+        except Exception as e:
+            logging.error(f"Error listing broadcast jobs: {e}")
+            return []
+
+    async def checkpoint_broadcast_job(self, job_id: str, last_user_id, done: int, success: int, failed: int,
+                                       dead_users: List[dict] = None):
+        """
+        Persist progress after a batch has been fully processed.
+
+        Dead users go to 'broadcast_dead_users', one document each, and only
+        their count is kept on the job document so it never grows with them.
+        """
+        update = {"$set": {
+            "last_user_id": last_user_id,
+            "done": done,
+            "success": success,
+            "failed": failed,
+            "updated_at": datetime.utcnow()
+        }}
+        try:
+            if dead_users:
+                now = datetime.utcnow()
+                result = await self.broadcast_dead_data.bulk_write([
+                    UpdateOne(
+                        {"job_id": job_id, "user_id": dead["user_id"]},
+                        {"$setOnInsert": {"reason": dead["reason"], "removed_at": now}},
+                        upsert=True
+                    )
+                    for dead in dead_users
+                ], ordered=False)
+                # A batch replayed after a crash does not count its users twice
+                update["$inc"] = {"dead_count": result.upserted_count}
+            await self.broadcast_data.update_one({"_id": job_id}, update)
+        except Exception as e:
+            logging.error(f"Error checkpointing broadcast {job_id}: {e}")
+
+    async def get_broadcast_dead_users(self, job_id: str) -> List[dict]:
+        """Dead users found by a job, as {'user_id', 'reason'} dicts."""
+        try:
+            dead_users = await self.broadcast_dead_data.find(
+                {"job_id": job_id}, {"_id": 0, "user_id": 1, "reason": 1}
+            ).to_list(None)
+            if dead_users:
+                return dead_users
+            # Jobs created before dead users moved out of the job document
+            legacy = await self.broadcast_data.find_one({"_id": job_id}, {"dead_users": 1})
+            return (legacy or {}).get("dead_users", [])
+        except Exception as e:
+            logging.error(f"Error reading dead users of broadcast {job_id}: {e}")
+            return []
+
+    async def set_broadcast_status(self, job_id: str, status: str, expected: List[str] = None) -> bool:
+        """Set a job's status, optionally only if it is currently in one of `expected`."""
+        query = {"_id": job_id}
+        if expected:
+            query["status"] = {"$in": expected}
+        result = await self.broadcast_data.update_one(
+            query,
+            {"$set": {"status": status, "updated_at": datetime.utcnow()}}
+        )
+        return result.matched_count > 0
+
+    # ==================== SCHEDULED JOB METHODS ====================
+
+    async def add_scheduled_job(self, kind: str, run_at: datetime, payload: dict) -> str:
+        """Persist a delayed job and return its ID."""
+        job_id = uuid.uuid4().hex
+        await self.scheduled_jobs.insert_one({
+            "_id": job_id,
+            "kind": kind,
+            "run_at": run_at,
+            "payload": payload
+        })
+        return job_id
+
+    async def get_scheduled_jobs(self) -> list:
+        """All pending jobs, soonest first."""
+        try:
+            return await self.scheduled_jobs.find().sort("run_at", 1).to_list(None)
+        except Exception as e:
+            logging.error(f"Error loading scheduled jobs: {e}")
+            return []
+
+    async def reschedule_jobs(self, job_ids: List[str], run_at: datetime):
+        await self.scheduled_jobs.update_many({"_id": {"$in": job_ids}}, {"$set": {"run_at": run_at}})
+
+    async def delete_scheduled_jobs(self, job_ids: List[str]):
+        try:
+            await self.scheduled_jobs.delete_many({"_id": {"$in": job_ids}})
+        except Exception as e:
+            logging.error(f"Error deleting scheduled jobs {job_ids}: {e}")
+
+    # ==================== MEDIA CACHE METHODS ====================
+
+    async def get_media_ids(self) -> Dict[str, str]:
+        try:
+            return {doc["_id"]: doc["file_id"] async for doc in self.media_data.find()}
+        except Exception as e:
+            logging.error(f"Error loading media file_ids: {e}")
+            return {}
+
+    async def save_media_id(self, url: str, file_id: str):
+        try:
+            await self.media_data.update_one(
+                {"_id": url},
+                {"$set": {"file_id": file_id, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            logging.error(f"Error saving file_id for {url}: {e}")
+
+    async def delete_media_id(self, url: str):
+        try:
+            await self.media_data.delete_one({"_id": url})
+        except Exception as e:
+            logging.error(f"Error deleting file_id for {url}: {e}")
+
+    # ==================== PRIMARY INVITE LINK METHODS ====================
+
+    async def get_primary_links(self) -> Dict[int, str]:
+        try:
+            return {doc["_id"]: doc["link"] async for doc in self.primary_links_data.find()}
+        except Exception as e:
+            logging.error(f"Error loading primary invite links: {e}")
+            return {}
+
+    async def save_primary_link(self, chat_id: int, link: str):
+        try:
+            await self.primary_links_data.update_one(
+                {"_id": chat_id},
+                {"$set": {"link": link, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            logging.error(f"Error saving primary invite link for {chat_id}: {e}")
+
+    async def delete_primary_link(self, chat_id: int):
+        try:
+            await self.primary_links_data.delete_one({"_id": chat_id})
+        except Exception as e:
+            logging.error(f"Error deleting primary invite link for {chat_id}: {e}")
+
+    # ==================== ADMIN & BAN METHODS ====================
+
+    async def load_access_lists(self):
+        """Replace the in-memory admin and ban sets with the current database contents."""
+        writes = self._access_writes
+        try:
+            admin_ids = {doc["_id"] async for doc in self.admins_data.find({}, {"_id": 1})}
+            banned_ids = {doc["_id"] async for doc in self.ban_data.find({"ban_status.is_banned": True}, {"_id": 1})}
+        except Exception as e:
+            logging.error(f"Error loading admin and ban lists: {e}")
+            return
+        if self.access_loaded and writes != self._access_writes:
+            # A write landed while reading and may be missing here; the next reconcile picks it up
+            return
+        self.admin_ids, self.banned_ids = admin_ids, banned_ids
+        self.access_loaded = True
+
+    async def is_user_banned(self, user_id) -> bool:
+        if self.access_loaded:
+            return user_id in self.banned_ids
         try:
-            user = await self.ban_data.find_one({"_id": user_id})
-            if user and user.get("ban_status", {}).get("is_banned", False):
-                return user
+            user = await self.ban_data.find_one({"_id": user_id}, {"ban_status.is_banned": 1})
+            return bool(user and user.get("ban_status", {}).get("is_banned", False))
         except Exception as e:
             logging.error(f"Error in checking ban status {user_id}: {e}")
+            return False
+
+    async def ban_user(self, user_id: int, reason: str):
+        await self.ban_data.update_one(
+            {"_id": user_id},
+            {"$set": {
+                "ban_status.is_banned": True,
+                "ban_status.ban_reason": reason,
+                "ban_status.banned_on": date.today().isoformat()
+            }},
+            upsert=True
+        )
+        self.banned_ids.add(user_id)
+        self._access_writes += 1
+
+    async def unban_user(self, user_id: int) -> bool:
+        """Lift a ban. Returns False if the user has no ban record."""
+        result = await self.ban_data.update_one(
+            {"_id": user_id},
+            {"$set": {
+                "ban_status.is_banned": False,
+                "ban_status.ban_reason": "",
+                "ban_status.banned_on": None
+            }}
+        )
+        self.banned_ids.discard(user_id)
+        self._access_writes += 1
+        return result.matched_count > 0
 
     async def is_admin(self, user_id: int) -> bool:
         """Check if a user is an admin."""
         try:
-            _id = int(user_id)
-            return bool(await self.admins_data.find_one({"_id": user_id}))
+            user_id = int(user_id)
+            if self.access_loaded:
+                return user_id in self.admin_ids
+            return bool(await self.admins_data.find_one({"_id": user_id}, {"_id": 1}))
         except Exception as e:
             logging.error(f"Error checking admin status for {user_id}: {e}")
             return False
@@ -101,12 +510,14 @@ class Master:
     async def add_admin(self, user_id: int) -> bool:
         """Add a user as admin."""
         try:
-            _id = int(user_id)
+            user_id = int(user_id)
             await self.admins_data.update_one(
                 {"_id": user_id},
                 {"$set": {"_id": user_id, "added_at": datetime.utcnow()}},
                 upsert=True
             )
+            self.admin_ids.add(user_id)
+            self._access_writes += 1
             return True
         except Exception as e:
             logging.error(f"Error adding admin {user_id}: {e}")
@@ -115,7 +526,10 @@ class Master:
     async def remove_admin(self, user_id: int) -> bool:
         """Remove a user from admins."""
         try:
+            user_id = int(user_id)
             result = await self.admins_data.delete_one({"_id": user_id})
+            self.admin_ids.discard(user_id)
+            self._access_writes += 1
             return result.deleted_count > 0
         except Exception as e:
             logging.error(f"Error removing admin {user_id}: {e}")
@@ -133,6 +547,50 @@ class Master:
     # ==================== CHANNEL DATA METHODS (Link Generation Only) ====================
     # These methods ONLY work with 'channels' collection for link generation
     # They DO NOT touch 'fsub' collection
+
+    def _cache_channel_doc(self, channel_id: int, channel: Optional[dict]):
+        """Store a 'channels' document (or a negative result) in the cache."""
+        self.channel_cache.set(channel_id, channel)
+        if channel:
+            for field in ("encoded_link", "req_encoded_link"):
+                if channel.get(field):
+                    self.channel_link_cache.set((field, channel[field]), channel_id)
+
+    def invalidate_channel(self, channel_id: int):
+        """Drop a channel from the cache; must be called after every write to it."""
+        channel = self.channel_cache.pop(channel_id)
+        if channel:
+            for field in ("encoded_link", "req_encoded_link"):
+                if channel.get(field):
+                    self.channel_link_cache.pop((field, channel[field]))
+
+    async def get_channel_doc(self, channel_id: int) -> Optional[dict]:
+        """
+        Get a channel document from 'channels' collection, served from the
+        TTL cache when possible. The returned dict is shared, do not mutate it.
+        """
+        channel = self.channel_cache.get(channel_id, _MISSING)
+        if channel is _MISSING:
+            channel = await self.channel_data.find_one({"channel_id": channel_id}, CHANNEL_PROJECTION)
+            self._cache_channel_doc(channel_id, channel)
+        return channel
+
+    async def _get_active_channel(self, channel_id: int) -> Optional[dict]:
+        channel = await self.get_channel_doc(channel_id)
+        return channel if channel and channel.get("status") == "active" else None
+
+    async def _get_channel_id_by_field(self, field: str, encoded_link: str) -> Optional[int]:
+        """Resolve channel_id from encoded_link/req_encoded_link, cache first."""
+        channel_id = self.channel_link_cache.get((field, encoded_link))
+        if channel_id is not None:
+            channel = await self._get_active_channel(channel_id)
+            if channel and channel.get(field) == encoded_link:
+                return channel_id
+        channel = await self.channel_data.find_one({field: encoded_link, "status": "active"}, CHANNEL_PROJECTION)
+        if channel and "channel_id" in channel:
+            self._cache_channel_doc(channel["channel_id"], channel)
+            return channel["channel_id"]
+        return None
     
     async def save_channel(self, channel_id: int) -> bool:
         """
@@ -172,6 +630,7 @@ class Master:
                 },
                 upsert=True
             )
+            self.invalidate_channel(channel_id)
             logging.info(f"✅ [SAVE_CHANNEL] Channel {channel_id} saved to 'channels' collection (link generation)")
             logging.info(f"ℹ️  [SAVE_CHANNEL] Channel {channel_id} is NOT in FSub list (use add_fsub_channel to add)")
             return True
@@ -193,6 +652,7 @@ class Master:
         """
         try:
             result = await self.channel_data.delete_one({"channel_id": channel_id})
+            self.invalidate_channel(channel_id)
             if result.deleted_count > 0:
                 logging.info(f"✅ [DELETE_CHANNEL] Channel {channel_id} deleted from 'channels' collection")
                 logging.info(f"ℹ️  [DELETE_CHANNEL] Channel {channel_id} may still be in FSub list")
@@ -226,7 +686,7 @@ class Master:
             return None
 
         try:
-            channel = await self.channel_data.find_one({"channel_id": channel_id, "status": "active"})
+            channel = await self._get_active_channel(channel_id)
             if channel and "encoded_link" in channel:
                 return channel["encoded_link"]
             else:
@@ -243,7 +703,7 @@ class Master:
             return None
 
         try:
-            channel = await self.channel_data.find_one({"channel_id": channel_id, "status": "active"})
+            channel = await self._get_active_channel(channel_id)
             if channel and "req_encoded_link" in channel:
                 return channel["req_encoded_link"]
             else:
@@ -276,6 +736,7 @@ class Master:
                 },
                 upsert=True
             )
+            self.invalidate_channel(channel_id)
             logging.info(f"Saved encoded link for channel {channel_id}: {encoded_link}")
             return encoded_link
         except Exception as e:
@@ -290,10 +751,9 @@ class Master:
 
         try:
             # First try: Search by encoded_link field
-            channel = await self.channel_data.find_one({"encoded_link": encoded_link, "status": "active"})
-            
-            if channel and "channel_id" in channel:
-                return channel["channel_id"]
+            channel_id = await self._get_channel_id_by_field("encoded_link", encoded_link)
+            if channel_id is not None:
+                return channel_id
             
             # Second try: Decode the base64 string
             try:
@@ -304,7 +764,7 @@ class Master:
                 decoded_id = int(decoded_string)
                 
                 # Check if channel exists
-                channel = await self.channel_data.find_one({"channel_id": decoded_id})
+                channel = await self.get_channel_doc(decoded_id)
                 
                 if channel:
                     # Update the encoded_link field
@@ -318,6 +778,7 @@ class Master:
                             }
                         }
                     )
+                    self.invalidate_channel(decoded_id)
                     return decoded_id
                 else:
                     # Create the channel entry
@@ -338,6 +799,7 @@ class Master:
                         },
                         upsert=True
                     )
+                    self.invalidate_channel(decoded_id)
                     return decoded_id
                     
             except Exception as decode_error:
@@ -368,6 +830,7 @@ class Master:
                 },
                 upsert=True
             )
+            self.invalidate_channel(channel_id)
             logging.info(f"Saved req_encoded link for channel {channel_id}: {encoded_link}")
             return encoded_link
         except Exception as e:
@@ -382,10 +845,9 @@ class Master:
 
         try:
             # First try: Search by req_encoded_link field
-            channel = await self.channel_data.find_one({"req_encoded_link": encoded_link, "status": "active"})
-            
-            if channel and "channel_id" in channel:
-                return channel["channel_id"]
+            channel_id = await self._get_channel_id_by_field("req_encoded_link", encoded_link)
+            if channel_id is not None:
+                return channel_id
             
             # Second try: Decode the base64 string
             try:
@@ -396,7 +858,7 @@ class Master:
                 decoded_id = int(decoded_string)
                 
                 # Check if channel exists
-                channel = await self.channel_data.find_one({"channel_id": decoded_id})
+                channel = await self.get_channel_doc(decoded_id)
                 
                 if channel:
                     # Update the req_encoded_link field
@@ -410,6 +872,7 @@ class Master:
                             }
                         }
                     )
+                    self.invalidate_channel(decoded_id)
                     return decoded_id
                 else:
                     # Create the channel entry
@@ -430,6 +893,7 @@ class Master:
                         },
                         upsert=True
                     )
+                    self.invalidate_channel(decoded_id)
                     return decoded_id
                     
             except Exception as decode_error:
@@ -460,6 +924,7 @@ class Master:
                 },
                 upsert=True
             )
+            self.invalidate_channel(channel_id)
             return True
         except Exception as e:
             logging.error(f"Error saving invite link for channel {channel_id}: {e}")
@@ -471,7 +936,7 @@ class Master:
             return None
 
         try:
-            channel = await self.channel_data.find_one({"channel_id": channel_id, "status": "active"})
+            channel = await self._get_active_channel(channel_id)
             if channel and "current_invite_link" in channel:
                 return {
                     "invite_link": channel["current_invite_link"],
@@ -482,12 +947,70 @@ class Master:
             logging.error(f"Error fetching current invite link for channel {channel_id}: {e}")
             return None
 
+    async def resolve_deep_link(self, channel_id: int, is_request: bool, req_encoded_link: str = None) -> Optional[dict]:
+        """
+        Resolve the link state of a channel for a /start deep link.
+
+        Served from the cache or one projected find_one. A single
+        find_one_and_update is issued only when the channel is missing,
+        inactive or its encoded link differs from the one being served.
+
+        Args:
+            channel_id: The decoded channel ID
+            is_request: True for 'req_' deep links
+            req_encoded_link: The encoded part of a 'req_' deep link
+
+        Returns:
+            dict: The channel document (see CHANNEL_PROJECTION), or None on error
+        """
+        if not isinstance(channel_id, int):
+            return None
+
+        string_bytes = str(channel_id).encode("ascii")
+        encoded_link = (base64.urlsafe_b64encode(string_bytes).decode("ascii")).strip("=")
+        if is_request:
+            field, value, other_field = "req_encoded_link", req_encoded_link or encoded_link, "encoded_link"
+        else:
+            field, value, other_field = "encoded_link", encoded_link, "req_encoded_link"
+
+        try:
+            channel = await self.get_channel_doc(channel_id)
+            if channel and channel.get("status") == "active" and channel.get(field) == value:
+                return channel
+
+            self.invalidate_channel(channel_id)
+            channel = await self.channel_data.find_one_and_update(
+                {"channel_id": channel_id},
+                {
+                    "$set": {
+                        "channel_id": channel_id,
+                        field: value,
+                        "status": "active",
+                        "updated_at": datetime.utcnow()
+                    },
+                    "$setOnInsert": {
+                        other_field: encoded_link,
+                        "invite_link_expiry": None,
+                        "created_at": datetime.utcnow()
+                    }
+                },
+                projection=CHANNEL_PROJECTION,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            self._cache_channel_doc(channel_id, channel)
+            logging.info(f"Updated {field} for channel {channel_id}: {value}")
+            return channel
+        except Exception as e:
+            logging.error(f"Error resolving deep link for channel {channel_id}: {e}")
+            return None
+
     async def get_original_link(self, channel_id: int) -> Optional[str]:
         """Get original link from 'channels' collection."""
         if not isinstance(channel_id, int):
             return None
         try:
-            channel = await self.channel_data.find_one({"channel_id": channel_id, "status": "active"})
+            channel = await self._get_active_channel(channel_id)
             return channel.get("original_link") if channel else None
         except Exception as e:
             logging.error(f"Error fetching original link for channel {channel_id}: {e}")
@@ -526,6 +1049,7 @@ class Master:
                 },
                 upsert=True
             )
+            self.fsub_channels_cache.clear()
             if result.matched_count == 0:
                 logging.info(f"✅ [ADD_FSUB] Channel {channel_id} added to 'fsub' collection (force subscription)")
                 logging.info(f"ℹ️  [ADD_FSUB] Channel {channel_id} is NOT in link generation (use save_channel to add)")
@@ -551,6 +1075,7 @@ class Master:
         """
         try:
             result = await self.fsub_data.delete_one({"channel_id": channel_id})
+            self.fsub_channels_cache.clear()
             if result.deleted_count > 0:
                 logging.info(f"✅ [REMOVE_FSUB] Channel {channel_id} removed from 'fsub' collection")
                 logging.info(f"ℹ️  [REMOVE_FSUB] Channel {channel_id} may still be in link generation")
@@ -562,13 +1087,21 @@ class Master:
             logging.error(f"❌ [REMOVE_FSUB] Error removing FSub channel {channel_id}: {e}")
             return False
 
+    async def get_fsub_modes(self) -> Dict[int, str]:
+        """Get {channel_id: mode} for every active channel in 'fsub', in collection order."""
+        async def load():
+            channels = await self.fsub_data.find({"status": "active"}).to_list(None)
+            modes = {channel["channel_id"]: channel.get("mode", "off") for channel in channels if "channel_id" in channel}
+            logging.debug("[GET_FSUB] Found %s channels in 'fsub' collection", len(modes))
+            return modes
+
+        # Concurrent misses after an expiry share one find
+        return dict(await self.fsub_channels_cache.get_or_load("active", load))
+
     async def get_fsub_channels(self) -> List[int]:
         """Get all channel IDs from 'fsub' collection."""
         try:
-            channels = await self.fsub_data.find({"status": "active"}).to_list(None)
-            channel_ids = [channel["channel_id"] for channel in channels if "channel_id" in channel]
-            logging.info(f"[GET_FSUB] Found {len(channel_ids)} channels in 'fsub' collection")
-            return channel_ids
+            return list(await self.get_fsub_modes())
         except Exception as e:
             logging.error(f"Error fetching FSub channels: {e}")
             return []
@@ -584,6 +1117,13 @@ class Master:
 
     async def get_channel_mode(self, channel_id: int):
         """Get mode from 'fsub' collection."""
+        # Active channels are answered from the cached channel list
+        try:
+            modes = await self.get_fsub_modes()
+            if channel_id in modes:
+                return modes[channel_id]
+        except Exception as e:
+            logging.error(f"Error fetching FSub modes: {e}")
         data = await self.fsub_data.find_one({'channel_id': channel_id})
         return data.get("mode", "off") if data else "off"
 
@@ -594,6 +1134,7 @@ class Master:
             {'$set': {'mode': mode}},
             upsert=True
         )
+        self.fsub_channels_cache.clear()
 
     async def set_channel_mode_all(self, mode: str) -> dict:
         """Set mode for all channels in 'fsub' collection."""
@@ -615,6 +1156,7 @@ class Master:
                     }
                 }
             )
+            self.fsub_channels_cache.clear()
 
             logging.info(f"Bulk mode update: Set {result.modified_count} channels to '{mode}' mode")
 
@@ -686,8 +1228,65 @@ class Master:
                 "message": f"Error: {str(e)}"
             }
 
+    # ==================== FSUB MEMBERSHIP METHODS ====================
+    # 'fsub_members' is fed by chat member updates and fronted by member_index
+
+    async def set_member_status(self, channel_id: int, user_id: int, is_member: bool):
+        """Record whether a user is currently a member of an fsub channel."""
+        updated_at = datetime.utcnow()
+        self.member_index.set((channel_id, user_id), (is_member, updated_at))
+        try:
+            await self.members_data.update_one(
+                {"channel_id": channel_id, "user_id": user_id},
+                {"$set": {"is_member": is_member, "updated_at": updated_at}},
+                upsert=True
+            )
+        except Exception as e:
+            logging.error(f"[DB ERROR] Failed to record membership {user_id} in {channel_id}: {e}")
+
+    async def get_member_record(self, channel_id: int, user_id: int) -> Optional[tuple]:
+        """
+        Get the recorded membership of a user in an fsub channel.
+
+        Pairs with no record are remembered in member_index too, so a
+        non-member polled again with get_chat_member does not also cost a
+        Mongo read every time.
+
+        Returns:
+            (is_member, updated_at) if known, None if the pair has never been observed
+        """
+        record = self.member_index.get((channel_id, user_id), _MISSING)
+        if record is not _MISSING:
+            return record
+        try:
+            doc = await self.members_data.find_one(
+                {"channel_id": channel_id, "user_id": user_id},
+                {"_id": 0, "is_member": 1, "updated_at": 1}
+            )
+        except Exception as e:
+            logging.error(f"[DB ERROR] Failed to read membership {user_id} in {channel_id}: {e}")
+            return None
+        record = (doc["is_member"], doc.get("updated_at")) if doc else None
+        self.member_index.set((channel_id, user_id), record)
+        return record
+
+    async def get_member_status(self, channel_id: int, user_id: int) -> Optional[bool]:
+        """
+        Get the recorded membership of a user in an fsub channel.
+
+        Returns:
+            True/False if known, None if the pair has never been observed
+        """
+        record = await self.get_member_record(channel_id, user_id)
+        return record[0] if record else None
+
     # ==================== UTILITY METHODS ====================
-    
+
+    async def ping(self) -> bool:
+        """Round-trip to the server, used by the readiness probe."""
+        result = await self.database.command("ping")
+        return bool(result.get("ok"))
+
     async def get_channel_status(self, channel_id: int) -> Dict:
         """
         Check where a channel exists (useful for debugging).
@@ -697,7 +1296,7 @@ class Master:
             - in_channels: bool (exists in link generation)
             - in_fsub: bool (exists in force subscription)
         """
-        in_channels = bool(await self.channel_data.find_one({"channel_id": channel_id, "status": "active"}))
+        in_channels = bool(await self._get_active_channel(channel_id))
         in_fsub = bool(await self.fsub_data.find_one({"channel_id": channel_id, "status": "active"}))
         
         return {
@@ -710,38 +1309,73 @@ class Master:
     # ==================== REQUEST FORCESUB METHODS ====================
 
     async def req_user(self, channel_id: int, user_id: int):
-        """Add user to request list for a channel."""
+        """Record a pending join request; it expires after JOIN_REQUEST_TTL."""
         try:
-            await self.rqst_fsub_Channel_data.update_one(
-                {'channel_id': int(channel_id)},
-                {'$addToSet': {'user_ids': int(user_id)}},
+            await self.join_requests_data.update_one(
+                {'channel_id': int(channel_id), 'user_id': int(user_id)},
+                {'$set': {'requested_at': datetime.utcnow()}},
                 upsert=True
             )
+        except DuplicateKeyError:
+            # A concurrent upsert for the same request won the race
+            pass
         except Exception as e:
             logging.error(f"[DB ERROR] Failed to add user to request list: {e}")
 
     async def del_req_user(self, channel_id: int, user_id: int):
         """Remove user from request list."""
-        await self.rqst_fsub_Channel_data.update_one(
-            {'channel_id': channel_id},
-            {'$pull': {'user_ids': user_id}}
-        )
+        await self.join_requests_data.delete_one({'channel_id': int(channel_id), 'user_id': int(user_id)})
 
     async def req_user_exist(self, channel_id: int, user_id: int):
         """Check if user exists in request list."""
         try:
-            found = await self.rqst_fsub_Channel_data.find_one({
-                'channel_id': int(channel_id),
-                'user_ids': int(user_id)
-            })
+            found = await self.join_requests_data.find_one(
+                {'channel_id': int(channel_id), 'user_id': int(user_id)},
+                {'_id': 1}
+            )
             return bool(found)
         except Exception as e:
             logging.error(f"[DB ERROR] Failed to check request list: {e}")
             return False
 
+    async def migrate_join_requests(self, batch_size: int = 1000) -> int:
+        """
+        Move the legacy 'request_forcesub_channel' user_ids arrays into
+        one document per request, deleting each legacy document once copied.
+
+        Returns:
+            int: Number of requests migrated
+        """
+        migrated = 0
+        async for legacy in self.rqst_fsub_Channel_data.find({}):
+            channel_id = legacy.get("channel_id")
+            user_ids = legacy.get("user_ids") or []
+            now = datetime.utcnow()
+            try:
+                for i in range(0, len(user_ids), batch_size):
+                    await self.join_requests_data.bulk_write([
+                        UpdateOne(
+                            {"channel_id": channel_id, "user_id": user_id},
+                            {"$setOnInsert": {"requested_at": now}},
+                            upsert=True
+                        )
+                        for user_id in user_ids[i:i + batch_size]
+                    ], ordered=False)
+                await self.rqst_fsub_Channel_data.delete_one({"_id": legacy["_id"]})
+                migrated += len(user_ids)
+            except Exception as e:
+                logging.error(f"[MIGRATE] Failed to migrate join requests of {channel_id}: {e}")
+        if migrated:
+            logging.info(f"[MIGRATE] Moved {migrated} join requests to 'fsub_join_requests'")
+        return migrated
+
     async def reqChannel_exist(self, channel_id: int):
         """Check if channel exists in 'channels' collection."""
-        channel_ids = await self.show_channels()
-        return channel_id in channel_ids
+        return bool(await self._get_active_channel(channel_id))
 
 Seishiro = Master(DB_URL, DB_NAME)
+
+register_cache("channel", Seishiro.channel_cache)
+register_cache("channel_link", Seishiro.channel_link_cache)
+register_cache("fsub_channels", Seishiro.fsub_channels_cache)
+register_cache("member_index", Seishiro.member_index)
@@ -1,6 +1,7 @@
 import base64
 import re
 import asyncio
+from collections import namedtuple
 from pyrogram import filters
 from pyrogram.enums import ChatMemberStatus
 from pyrogram.errors.exceptions.bad_request_400 import UserNotParticipant
@@ -9,6 +10,18 @@ from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from pyrogram.filters import Filter
 from config import *
 from database.database import Seishiro
+from cache import TTLCache
+from metrics import register_cache
+
+# Force-sub membership verdicts keyed by (user_id, channel_id)
+membership_cache = TTLCache(MEMBER_CACHE_TTL, maxsize=MEMBER_CACHE_SIZE)
+
+# Compact chat records keyed by chat_id, instead of full pyrogram Chat objects
+ChatInfo = namedtuple("ChatInfo", ["id", "title", "username", "invite_link"])
+chat_cache = TTLCache(CHAT_CACHE_TTL, maxsize=CHAT_CACHE_SIZE)
+
+register_cache("membership", membership_cache)
+register_cache("chat", chat_cache)
 
 async def encode(string):
     string_bytes = string.encode("ascii")
@@ -43,3 +56,26 @@ def get_readable_time(seconds: int) -> str:
     time_list.reverse()
     up_time += ":".join(time_list)
     return up_time
+
+def get_cached_membership(user_id: int, channel_id: int):
+    """Return the cached membership verdict, or None if unknown."""
+    return membership_cache.get((user_id, channel_id))
+
+def cache_membership(user_id: int, channel_id: int, is_member: bool):
+    ttl = MEMBER_CACHE_TTL if is_member else MEMBER_CACHE_NEG_TTL
+    membership_cache.set((user_id, channel_id), is_member, ttl=ttl)
+
+def invalidate_membership(user_id: int, channel_id: int):
+    membership_cache.pop((user_id, channel_id))
+
+async def get_chat_info(client, chat_id: int, refresh: bool = False) -> ChatInfo:
+    """Cached get_chat; concurrent misses for one chat make a single API call."""
+    if refresh:
+        chat_cache.pop(chat_id)
+
+    async def load():
+        chat = await client.get_chat(chat_id)
+        # invite_link is the primary link, only reported to admins with invite rights
+        return ChatInfo(chat.id, chat.title, chat.username, getattr(chat, "invite_link", None))
+
+    return await chat_cache.get_or_load(chat_id, load)
@@ -0,0 +1,287 @@
+import bisect
+import contextvars
+import inspect
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import wraps
+
+# Every metric registers itself here; render() walks it in definition order
+REGISTRY = []
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: dict = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in (extra or {}).items()]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = defaultdict(float)
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] += amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels):
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, labels, {"le": bound}), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _format_labels(self.labelnames, labels), count
+
+
+class CallbackMetric:
+    """Metric whose samples are read from live objects at scrape time."""
+
+    def __init__(self, name: str, documentation: str, labelnames=(), callback=None, kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.kind = kind
+        REGISTRY.append(self)
+
+    def samples(self):
+        for labels, value in self.callback().items():
+            labels = labels if isinstance(labels, tuple) else (labels,)
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        try:
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        except Exception as e:
+            lines.append(f"# failed to collect {metric.name}: {_escape(e)}")
+    return "\n".join(lines) + "\n"
+
+
+# ==================== BOT METRICS ====================
+
+HANDLER_LATENCY = Histogram("linkshare_handler_seconds", "Time spent in an update handler", ["handler"])
+HANDLER_ERRORS = Counter("linkshare_handler_errors_total", "Update handlers that raised", ["handler"])
+TELEGRAM_LATENCY = Histogram("linkshare_telegram_request_seconds", "Telegram API call latency, excluding rate limiter wait", ["method"])
+TELEGRAM_ERRORS = Counter("linkshare_telegram_errors_total", "Telegram API calls that raised", ["method", "error"])
+DB_LATENCY = Histogram("linkshare_db_seconds", "Latency of Master database methods", ["method"])
+DB_ERRORS = Counter("linkshare_db_errors_total", "Master database methods that raised", ["method"])
+
+# name -> TTLCache, see register_cache()
+CACHES = {}
+
+
+def register_cache(name: str, cache):
+    CACHES[name] = cache
+
+
+CallbackMetric("linkshare_cache_hits_total", "Cache hits", ["cache"], lambda: {n: c.hits for n, c in CACHES.items()}, "counter")
+CallbackMetric("linkshare_cache_misses_total", "Cache misses", ["cache"], lambda: {n: c.misses for n, c in CACHES.items()}, "counter")
+CallbackMetric("linkshare_cache_hit_ratio", "Cache hit ratio since start", ["cache"], lambda: {n: c.hit_ratio for n, c in CACHES.items()})
+CallbackMetric("linkshare_cache_entries", "Entries currently held", ["cache"], lambda: {n: len(c) for n, c in CACHES.items()})
+
+
+# ==================== PHASE TIMING ====================
+
+class RollingHistogram:
+    """
+    Fixed-size log-bucketed histogram over roughly the last `window` seconds.
+
+    Two generations are kept and the older one is dropped every `window`
+    seconds, so percentiles cover between one and two windows of samples.
+    Memory and observe() cost are constant whatever the traffic.
+    """
+
+    # Exactly zero (phase not used), then 1ms to ~60s in 25% steps
+    BOUNDS = (0.0,) + tuple(0.001 * 1.25 ** i for i in range(50))
+
+    def __init__(self, window: float = 300):
+        self.window = window
+        self._current = [0] * (len(self.BOUNDS) + 1)
+        self._previous = [0] * (len(self.BOUNDS) + 1)
+        self._rotated_at = time.monotonic()
+
+    def _rotate(self):
+        now = time.monotonic()
+        if now - self._rotated_at >= self.window:
+            expired = now - self._rotated_at >= 2 * self.window
+            self._previous = [0] * len(self._current) if expired else self._current
+            self._current = [0] * len(self._previous)
+            self._rotated_at = now
+
+    def observe(self, value: float):
+        self._rotate()
+        self._current[bisect.bisect_left(self.BOUNDS, value)] += 1
+
+    @property
+    def count(self) -> int:
+        self._rotate()
+        return sum(self._current) + sum(self._previous)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (0 < q <= 1)."""
+        self._rotate()
+        counts = [a + b for a, b in zip(self._current, self._previous)]
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for bound, bucket_count in zip(self.BOUNDS + (float("inf"),), counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound if bound != float("inf") else self.BOUNDS[-1]
+        return self.BOUNDS[-1]
+
+
+PHASES = ("total", "db", "api", "local")
+
+# handler or section name -> phase -> RollingHistogram
+PERF = defaultdict(lambda: {phase: RollingHistogram() for phase in PHASES})
+
+
+class _Span:
+    __slots__ = ("parent", "db", "api")
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.db = 0.0
+        self.api = 0.0
+
+
+_current_span = contextvars.ContextVar("perf_span", default=None)
+_in_db_call = contextvars.ContextVar("perf_in_db_call", default=False)
+
+
+def _add_phase_time(phase: str, elapsed: float):
+    span = _current_span.get()
+    while span is not None:
+        setattr(span, phase, getattr(span, phase) + elapsed)
+        span = span.parent
+
+
+def record_api_time(elapsed: float):
+    """Charge a Telegram call to every span active in the current context."""
+    _add_phase_time("api", elapsed)
+
+
+@asynccontextmanager
+async def track_section(name: str):
+    """
+    Time a block and split it into DB, Telegram API and local time.
+
+    Sections nest; time spent in an inner section also counts towards the
+    enclosing ones. Concurrent subtasks share their parent's span, so their
+    DB/API time can add up to more than the wall time; local time is
+    clamped at zero in that case.
+    """
+    span = _Span(_current_span.get())
+    token = _current_span.set(span)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+        total = time.perf_counter() - started
+        histograms = PERF[name]
+        histograms["total"].observe(total)
+        histograms["db"].observe(span.db)
+        histograms["api"].observe(span.api)
+        histograms["local"].observe(max(0.0, total - span.db - span.api))
+
+
+def track_handler(func):
+    """Record latency, phase split and failures of an update handler under its function name."""
+    name = func.__name__
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            async with track_section(name):
+                return await func(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - started, name)
+    return wrapper
+
+
+def track_db_methods(cls):
+    """Class decorator timing every public coroutine method of a database class."""
+    for attr, func in list(vars(cls).items()):
+        if attr.startswith("_") or not inspect.iscoroutinefunction(func):
+            continue
+        setattr(cls, attr, _timed_db_method(func))
+    return cls
+
+
+def _timed_db_method(func):
+    name = func.__name__
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        # Master methods call each other; only the outermost call counts as DB time
+        outermost = not _in_db_call.get()
+        token = _in_db_call.set(True)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            DB_ERRORS.inc(name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _in_db_call.reset(token)
+            DB_LATENCY.observe(elapsed, name)
+            if outermost:
+                _add_phase_time("db", elapsed)
+    return wrapper
@@ -1,50 +1,154 @@
 import os
 import asyncio
+import logging
+from collections import OrderedDict
 from bot import Bot
 from config import *
 from pyrogram import Client, filters
 from pyrogram.types import Message, User, ChatJoinRequest, InlineKeyboardMarkup, InlineKeyboardButton
 from pyrogram.errors import FloodWait, ChatAdminRequired, UserNotParticipant, UserAlreadyParticipant
 from helper_func import *
+from database.database import Seishiro
+from plugins.media import media_registry
+from plugins.invite_pool import primary_link_registry
+from metrics import track_handler, CallbackMetric
+from ratelimit import TokenBucket
+from pyrogram.enums import ChatMemberStatus
+
+logger = logging.getLogger(__name__)
 
 AUTO_APPROVE_ENABLED = True
 
-@Client.on_chat_join_request((filters.group | filters.channel))
-async def auto_approve(client: Bot, message: ChatJoinRequest):
-    global AUTO_APPROVE_ENABLED
-    chat = message.chat
-    user = message.from_user
-    print(f"{user.first_name} requested to join {chat.title}")
-    
-    await asyncio.sleep(2)
-    
-    # Check if user is already a participant before approving
-    try:
-        member = await client.get_chat_member(chat.id, user.id)
-        if member.status in ["member", "administrator", "creator"]:
-            print(f"User {user.id} is already a participant of {chat.id}, skipping approval.")
+
+class ApprovalEngine:
+    """
+    Approves join requests from per-channel queues instead of in the update handler.
+
+    Each channel with pending requests gets one drainer task. It waits
+    `delay` seconds so a burst can accumulate, then approves requests one by
+    one through a shared token bucket. Once a channel's backlog reaches
+    `bulk_threshold`, it approves everything in a single
+    approve_all_chat_join_requests call instead. Welcome DMs go to a separate
+    bounded queue drained at a lower rate, so they never hold up approvals, and
+    link to the chat's primary invite link from primary_link_registry.
+    """
+
+    def __init__(self, rate: float, bulk_threshold: int, welcome_rate: float, welcome_queue_size: int, delay: float = 2):
+        self.bulk_threshold = bulk_threshold
+        self.delay = delay
+        self.bucket = TokenBucket(rate)
+        self.welcome_bucket = TokenBucket(welcome_rate)
+        self.welcome_queue_size = welcome_queue_size
+        # chat_id -> OrderedDict(user_id -> request), so a repeated request is queued once
+        self.queues = {}
+        self.drainers = {}
+        self.welcome_queue = None
+        self.welcome_task = None
+        self.approved = 0
+        self.bulk_approved = 0
+
+    def submit(self, client, request: ChatJoinRequest):
+        chat_id = request.chat.id
+        self.queues.setdefault(chat_id, OrderedDict())[request.from_user.id] = request
+        if chat_id not in self.drainers:
+            self.drainers[chat_id] = asyncio.create_task(self._drain(client, chat_id))
+        if self.welcome_task is None:
+            self.welcome_queue = asyncio.Queue(maxsize=self.welcome_queue_size)
+            self.welcome_task = asyncio.create_task(self._welcome_worker(client))
+
+    @property
+    def backlog(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    async def _drain(self, client, chat_id: int):
+        try:
+            await asyncio.sleep(self.delay)
+            queue = self.queues[chat_id]
+            bulk = True
+            while queue:
+                if bulk and len(queue) >= self.bulk_threshold:
+                    bulk = await self._approve_all(client, chat_id, queue)
+                    continue
+                user_id, request = queue.popitem(last=False)
+                try:
+                    await self._approve_one(client, request)
+                except FloodWait as e:
+                    logger.warning("FloodWait of %ss while approving in %s", e.value, chat_id)
+                    queue[user_id] = request
+                    queue.move_to_end(user_id, last=False)
+                    await asyncio.sleep(e.value)
+        finally:
+            self.queues.pop(chat_id, None)
+            self.drainers.pop(chat_id, None)
+
+    async def _approve_one(self, client, request: ChatJoinRequest):
+        chat, user = request.chat, request.from_user
+        # A pending request means the user is not a member, so the membership
+        # table is not consulted; a stale entry there would strand the request
+        await self.bucket.acquire()
+        try:
+            await client.approve_chat_join_request(chat_id=chat.id, user_id=user.id)
+        except UserAlreadyParticipant:
+            logger.debug("User %s is already a participant of %s", user.id, chat.id)
+            return
+        except FloodWait:
+            raise
+        except Exception as e:
+            logger.error("Error approving join request of %s in %s: %s", user.id, chat.id, e)
             return
-    except UserNotParticipant:
-        # User is not a participant, proceed with approval
-        pass
-    except Exception as e:
-        print(f"Error checking membership: {e}")
-        return
-    
-    # Approve the join request
-    try:
-        await client.approve_chat_join_request(chat_id=chat.id, user_id=user.id)
-        print(f"Approved join request for {user.first_name} ({user.id})")
-    except UserAlreadyParticipant:
-        print(f"User {user.id} is already a participant.")
-        return
-    except Exception as e:
-        print(f"Error approving join request: {e}")
-        return
-    
-    # Send welcome message with invite link
-    try:
-        invite_link = await client.export_chat_invite_link(chat.id)
+        invalidate_membership(user.id, chat.id)
+        self.approved += 1
+        logger.debug("Approved join request of %s in %s", user.id, chat.id)
+        self._queue_welcome(request)
+
+    async def _approve_all(self, client, chat_id: int, queue: OrderedDict) -> bool:
+        """Approve every pending request in one call. False means fall back to single approvals."""
+        requests = list(queue.values())
+        queue.clear()
+        await self.bucket.acquire()
+        try:
+            await client.approve_all_chat_join_requests(chat_id)
+        except FloodWait as e:
+            logger.warning("FloodWait of %ss during bulk approval in %s", e.value, chat_id)
+            for request in requests:
+                queue[request.from_user.id] = request
+            await asyncio.sleep(e.value)
+            return True
+        except Exception as e:
+            logger.warning("Bulk approval failed in %s, approving one by one: %s", chat_id, e)
+            for request in requests:
+                queue[request.from_user.id] = request
+            return False
+        self.bulk_approved += len(requests)
+        logger.info("Bulk approved %d join requests in %s", len(requests), chat_id)
+        for request in requests:
+            invalidate_membership(request.from_user.id, chat_id)
+            self._queue_welcome(request)
+        return True
+
+    def _queue_welcome(self, request: ChatJoinRequest):
+        try:
+            self.welcome_queue.put_nowait(request)
+        except asyncio.QueueFull:
+            logger.warning("Welcome queue full, skipping welcome message for %s", request.from_user.id)
+
+    async def _welcome_worker(self, client):
+        while True:
+            request = await self.welcome_queue.get()
+            try:
+                await self.welcome_bucket.acquire()
+                await self._send_welcome(client, request)
+            except FloodWait as e:
+                logger.warning("FloodWait of %ss in welcome messages", e.value)
+                await asyncio.sleep(e.value)
+            except Exception as e:
+                logger.warning("Error sending welcome message to %s: %s", request.from_user.id, e)
+            finally:
+                self.welcome_queue.task_done()
+
+    async def _send_welcome(self, client, request: ChatJoinRequest):
+        chat, user = request.chat, request.from_user
+        invite_link = await primary_link_registry.get(client, chat.id)
         buttons = [
             [InlineKeyboardButton('• Cʟɪᴄᴋ ʜᴇʀᴇ •', url=invite_link)]
         ]
@@ -53,13 +157,29 @@ async def auto_approve(client: Bot, message: ChatJoinRequest):
             f"<b>⁉️ Bᴀᴋᴀᴀᴀ!!!... {user.mention}</b>,\n\n"
             f"<b><blockquote>ʏᴏᴜʀ ʀᴇǫᴜᴇsᴛ ᴛᴏ ᴊᴏɪɴ {chat.title} ʜᴀs ʙᴇᴇɴ ᴀᴘᴘʀᴏᴠᴇᴅ ʙʏ ᴀᴅᴍɪɴ/ᴏᴡɴᴇʀ.</blockquote></b>"
         )
-        
-        await client.send_photo(
+
+        await media_registry.send(APPROVE_PIC, lambda photo: client.send_photo(
             chat_id=user.id,
-            photo='https://files.catbox.moe/ycogc8.jpg',
+            photo=photo,
             caption=caption_approve_ka,
             reply_markup=markup
-        )
-        print(f"Sent welcome message to {user.first_name} ({user.id})")
-    except Exception as e:
-        print(f"Error sending welcome message: {e}")
+        ))
+        logger.debug("Sent welcome message to %s", user.id)
+
+
+approval_engine = ApprovalEngine(APPROVE_RATE, APPROVE_BULK_THRESHOLD, WELCOME_RATE, WELCOME_QUEUE_SIZE, APPROVE_DELAY)
+
+CallbackMetric("linkshare_join_request_backlog", "Join requests waiting for approval", callback=lambda: {(): approval_engine.backlog})
+CallbackMetric("linkshare_join_requests_approved_total", "Join requests approved", ["mode"],
+               lambda: {"single": approval_engine.approved, "bulk": approval_engine.bulk_approved}, "counter")
+
+@Client.on_chat_join_request((filters.group | filters.channel))
+@track_handler
+async def auto_approve(client: Bot, message: ChatJoinRequest):
+    global AUTO_APPROVE_ENABLED
+    chat = message.chat
+    user = message.from_user
+    logger.debug("%s requested to join %s", user.id, chat.id)
+
+    # Approval and the welcome DM happen in the engine, off the update workers
+    approval_engine.submit(client, message)
@@ -0,0 +1,386 @@
+import asyncio
+import io
+import time
+import logging
+from datetime import timedelta
+from pyrogram import Client, filters
+from pyrogram.enums import ParseMode
+from pyrogram.types import Message
+from pyrogram.errors import FloodWait, InputUserDeactivated, UserIsBlocked, PeerIdInvalid, RPCError
+
+from bot import Bot
+from config import *
+from database.database import Seishiro
+from plugins.start import admin
+from ratelimit import TokenBucket, bulk_traffic
+from metrics import track_handler
+
+logger = logging.getLogger(__name__)
+
+# job_id -> BroadcastEngine for jobs running in this process
+active_broadcasts = {}
+
+
+class BroadcastEngine:
+    """
+    Copies one message to many users with a pool of async workers.
+
+    Every send takes a token from a shared bucket, so the pool as a whole
+    stays under BROADCAST_RATE messages/s. A FloodWait seen by any worker
+    pauses the bucket, which backs off all workers at once. Workers send as
+    bulk_traffic, so the API governor keeps part of the global message budget
+    free for interactive handlers.
+
+    Users are read in _id order in batches of BROADCAST_BATCH_SIZE; after a
+    batch is fully processed its last _id and the counters are checkpointed
+    to the job document, so a restarted job resumes where it stopped.
+
+    Dead users (blocked, deactivated, invalid peer) are buffered and removed
+    with one delete_many per batch instead of one delete per user; they are
+    also recorded in the job's dead user report.
+    """
+
+    def __init__(self, job: dict, message: Message, workers: int = BROADCAST_WORKERS, rate: float = BROADCAST_RATE):
+        self.job_id = job["_id"]
+        self.message = message
+        self.workers = max(1, workers)
+        self.bucket = TokenBucket(rate)
+        self.total = job.get("total", 0)
+        self.done = job.get("done", 0)
+        self.success = job.get("success", 0)
+        self.failed = job.get("failed", 0)
+        self.last_user_id = job.get("last_user_id")
+        self.removed = job.get("dead_count", 0)
+        self.dead_buffer = []
+        self.stop_status = None
+        self.started_at = None
+        self._done_at_start = self.done
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at if self.started_at else 0.0
+
+    @property
+    def throughput(self) -> float:
+        return (self.done - self._done_at_start) / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def eta(self) -> timedelta:
+        remaining = max(0, self.total - self.done)
+        return timedelta(seconds=int(remaining / self.throughput)) if self.throughput else timedelta(0)
+
+    def stop(self, status: str):
+        """Stop after the current batch; status is 'paused' or 'cancelled'."""
+        self.stop_status = status
+
+    async def send(self, user_id: int) -> int:
+        """Copy the message to one user; returns 200, 400 (dead user) or 500."""
+        for _ in range(BROADCAST_MAX_RETRIES):
+            await self.bucket.acquire()
+            try:
+                await self.message.copy(chat_id=int(user_id))
+                return 200
+            except FloodWait as e:
+                logger.warning("FloodWait for user %s: pausing all workers for %ss", user_id, e.value)
+                self.bucket.pause(e.value)
+            except InputUserDeactivated:
+                logger.debug("%s : Deactivated", user_id)
+                self.dead_buffer.append({"user_id": user_id, "reason": "deactivated"})
+                return 400
+            except UserIsBlocked:
+                logger.debug("%s : Blocked The Bot", user_id)
+                self.dead_buffer.append({"user_id": user_id, "reason": "blocked"})
+                return 400
+            except PeerIdInvalid:
+                logger.debug("%s : User ID Invalid", user_id)
+                self.dead_buffer.append({"user_id": user_id, "reason": "invalid peer"})
+                return 400
+            except RPCError as e:
+                logger.error("%s : RPC Error - %s", user_id, e)
+                return 500
+            except Exception as e:
+                logger.error("%s : Unexpected error - %s", user_id, e)
+                return 500
+        return 500
+
+    def handle_result(self, user_id: int, status: int):
+        if status == 200:
+            self.success += 1
+        else:
+            self.failed += 1
+        self.done += 1
+
+    async def flush_batch(self):
+        """Bulk-delete buffered dead users and checkpoint the finished batch."""
+        dead_users, self.dead_buffer = self.dead_buffer, []
+        if dead_users:
+            self.removed += await Seishiro.delete_users([dead["user_id"] for dead in dead_users])
+        await Seishiro.checkpoint_broadcast_job(
+            self.job_id, self.last_user_id, self.done, self.success, self.failed, dead_users
+        )
+
+    async def _worker(self, queue: asyncio.Queue):
+        # Each worker is its own task, so this only marks broadcast sends
+        bulk_traffic.set(True)
+        while True:
+            user_id = await queue.get()
+            try:
+                self.handle_result(user_id, await self.send(user_id))
+            except Exception as e:
+                logger.error("Error processing user %s: %s", user_id, e)
+                self.failed += 1
+                self.done += 1
+            finally:
+                queue.task_done()
+
+    async def run(self) -> str:
+        """Run until all users are processed or stop() is called; returns the final status."""
+        self.started_at = time.monotonic()
+        queue = asyncio.Queue()
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.workers)]
+        try:
+            while self.stop_status is None:
+                user_ids = await Seishiro.get_users_after(self.last_user_id, BROADCAST_BATCH_SIZE)
+                if not user_ids:
+                    return "completed"
+                for user_id in user_ids:
+                    queue.put_nowait(user_id)
+                await queue.join()
+                self.last_user_id = user_ids[-1]
+                await self.flush_batch()
+            return self.stop_status
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    def progress_text(self) -> str:
+        return (
+            f"Broadcast In Progress: \n\n"
+            f"Job : <code>{self.job_id}</code>\n"
+            f"Total Users {self.total} \n"
+            f"Completed : {self.done} / {self.total}\n"
+            f"Success : {self.success}\n"
+            f"Failed : {self.failed}\n"
+            f"Removed : {self.removed}\n"
+            f"Speed : {self.throughput:.1f} msg/s\n"
+            f"ETA : {self.eta}"
+        )
+
+    def summary_text(self, status: str) -> str:
+        title = "Bʀᴏᴀᴅᴄᴀꜱᴛ Cᴏᴍᴩʟᴇᴛᴇᴅ" if status == "completed" else f"Broadcast {status.capitalize()}"
+        return (
+            f"{title}: \n"
+            f"Job : <code>{self.job_id}</code>\n"
+            f"Cᴏᴍᴩʟᴇᴛᴇᴅ Iɴ {timedelta(seconds=int(self.elapsed))}.\n\n"
+            f"Total Users {self.total}\n"
+            f"Completed: {self.done} / {self.total}\n"
+            f"Success: {self.success}\n"
+            f"Failed: {self.failed}\n"
+            f"Removed: {self.removed}\n"
+            f"Speed: {self.throughput:.1f} msg/s"
+        )
+
+
+async def report_progress(engine: BroadcastEngine, sts_msg: Message):
+    """Edit the status message every BROADCAST_STATUS_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(BROADCAST_STATUS_INTERVAL)
+        try:
+            await sts_msg.edit(engine.progress_text())
+        except FloodWait as e:
+            logger.warning("FloodWait during status update: skipping edits for %ss", e.value)
+            await asyncio.sleep(e.value)
+        except Exception as e:
+            logger.error("Error updating broadcast status: %s", e)
+
+
+async def run_broadcast_job(client: Client, job: dict, sts_msg: Message):
+    """Run (or resume) a stored broadcast job, reporting into sts_msg."""
+    job_id = job["_id"]
+    try:
+        message = await client.get_messages(job["chat_id"], job["message_id"])
+        if not message or message.empty:
+            raise ValueError("source message no longer exists")
+    except Exception as e:
+        logger.error("Cannot load source message for broadcast %s: %s", job_id, e)
+        await Seishiro.set_broadcast_status(job_id, "failed")
+        await sts_msg.edit(f"<b>❌ Bʀᴏᴀᴅᴄᴀsᴛ Fᴀɪʟᴇᴅ!</b>\n\n<blockquote expandable><b>Eʀʀᴏʀ:</b> {e}</blockquote>")
+        return
+
+    engine = BroadcastEngine(job, message)
+    active_broadcasts[job_id] = engine
+    reporter = asyncio.create_task(report_progress(engine, sts_msg))
+    try:
+        status = await engine.run()
+        active_broadcasts.pop(job_id, None)
+        logger.info("Broadcast %s %s: %s / %s done, %s success, %s failed, %s removed",
+                    job_id, status, engine.done, engine.total, engine.success, engine.failed, engine.removed)
+        reporter.cancel()
+        # 'paused' and 'cancelled' were already stored by the /bcast command
+        if status == "completed":
+            await Seishiro.set_broadcast_status(job_id, "completed")
+
+        try:
+            await sts_msg.edit(engine.summary_text(status))
+        except Exception as e:
+            logger.error("Error sending final broadcast status: %s", e)
+            # Try sending as new message if edit fails
+            try:
+                await client.send_message(job["admin_chat_id"], engine.summary_text(status))
+            except Exception as e2:
+                logger.error("Error sending fallback broadcast status: %s", e2)
+
+    except Exception as e:
+        active_broadcasts.pop(job_id, None)
+        logger.error("Critical error during broadcast %s: %s", job_id, e)
+        await Seishiro.set_broadcast_status(job_id, "failed")
+        try:
+            await sts_msg.edit(
+                f"<b>❌ Bʀᴏᴀᴅᴄᴀsᴛ Fᴀɪʟᴇᴅ!</b>\n\n"
+                f"Job: <code>{job_id}</code>\n"
+                f"Completed: {engine.done}\n"
+                f"Success: {engine.success}\n"
+                f"Failed: {engine.failed}\n\n"
+                f"<blockquote expandable><b>Eʀʀᴏʀ:</b> {str(e)}</blockquote>\n"
+                f"<i>Use /bcast resume {job_id} to continue.</i>",
+                parse_mode=ParseMode.HTML
+            )
+        except:
+            pass
+    finally:
+        reporter.cancel()
+
+
+async def resume_broadcasts(client: Client):
+    """Resume every job left 'running' by a previous process."""
+    for job in await Seishiro.list_broadcast_jobs(["running"], limit=0):
+        if job["_id"] in active_broadcasts:
+            continue
+        try:
+            sts_msg = await client.send_message(
+                job["admin_chat_id"],
+                f"Resuming broadcast <code>{job['_id']}</code> from {job['done']} / {job['total']}..."
+            )
+        except Exception as e:
+            logger.error("Cannot report resume of broadcast %s: %s", job['_id'], e)
+            continue
+        logger.info("Resuming broadcast %s after restart", job['_id'])
+        asyncio.create_task(run_broadcast_job(client, job, sts_msg))
+
+
+@Bot.on_message(filters.command("broadcast") & filters.private & admin)
+@track_handler
+async def broadcast_handler(bot: Client, m: Message):
+    try:
+        # Check if command is used as a reply
+        if not m.reply_to_message:
+            return await m.reply_text(
+                "<b>⚠️ Pʟᴇᴀsᴇ ʀᴇᴘʟʏ ᴛᴏ ᴀ ᴍᴇssᴀɢᴇ ᴛᴏ ʙʀᴏᴀᴅᴄᴀsᴛ ɪᴛ!</b>\n\n"
+                "<i>Usᴀɢᴇ: Rᴇᴘʟʏ ᴛᴏ ᴀɴʏ ᴍᴇssᴀɢᴇ ᴀɴᴅ ᴜsᴇ /broadcast</i>",
+                parse_mode=ParseMode.HTML
+            )
+
+        try:
+            total_users = await Seishiro.total_users_count()
+        except Exception as e:
+            logger.error("Error getting total users count: %s", e)
+            total_users = 0
+
+        try:
+            job_id = await Seishiro.create_broadcast_job(
+                m.chat.id, m.reply_to_message.id, m.chat.id, total_users
+            )
+            job = await Seishiro.get_broadcast_job(job_id)
+        except Exception as e:
+            logger.error("Error creating broadcast job: %s", e)
+            return await m.reply_text(
+                "<b>❌ Eʀʀᴏʀ ᴄʀᴇᴀᴛɪɴɢ ʙʀᴏᴀᴅᴄᴀsᴛ ᴊᴏʙ!</b>",
+                parse_mode=ParseMode.HTML
+            )
+
+        try:
+            sts_msg = await m.reply_text(f"Bʀᴏᴀᴅᴄᴀsᴛ Sᴛᴀʀᴛᴇᴅ...!!\nJob: <code>{job_id}</code>")
+        except Exception as e:
+            logger.error("Error sending broadcast start message: %s", e)
+            return
+
+        # Run detached so the broadcast does not hold an update worker for its whole duration
+        asyncio.create_task(run_broadcast_job(bot, job, sts_msg))
+
+    except Exception as e:
+        logger.error("Fatal error in broadcast_handler: %s", e)
+        try:
+            await m.reply_text(
+                f"<b>❌ Aɴ ᴜɴᴇxᴘᴇᴄᴛᴇᴅ ᴇʀʀᴏʀ ᴏᴄᴄᴜʀʀᴇᴅ! {e}</b>\n\n"
+                f"<i>Pʟᴇᴀsᴇ ᴄᴏɴᴛᴀᴄᴛ ᴛʜᴇ ᴅᴇᴠᴇʟᴏᴘᴇʀ.</i>",
+                parse_mode=ParseMode.HTML
+            )
+        except:
+            pass
+
+
+@Bot.on_message(filters.command("bcast") & filters.private & admin)
+async def broadcast_jobs_handler(bot: Client, m: Message):
+    usage = (
+        "<b><blockquote expandable>ᴜsᴀɢᴇ:\n"
+        "<code>/bcast list</code>\n"
+        "<code>/bcast pause job_id</code>\n"
+        "<code>/bcast resume job_id</code>\n"
+        "<code>/bcast cancel job_id</code>\n"
+        "<code>/bcast dead job_id</code></blockquote></b>"
+    )
+    action = m.command[1].lower() if len(m.command) > 1 else "list"
+
+    if action == "list":
+        jobs = await Seishiro.list_broadcast_jobs(limit=10)
+        if not jobs:
+            return await m.reply_text("<b>Nᴏ ʙʀᴏᴀᴅᴄᴀsᴛ ᴊᴏʙs ғᴏᴜɴᴅ.</b>")
+        lines = [
+            f"• <code>{job['_id']}</code> - {job['status']} - {job['done']} / {job['total']}"
+            for job in jobs
+        ]
+        return await m.reply_text("<b>Bʀᴏᴀᴅᴄᴀsᴛ ᴊᴏʙs:</b>\n\n" + "\n".join(lines))
+
+    if action not in ("pause", "resume", "cancel", "dead") or len(m.command) < 3:
+        return await m.reply_text(usage)
+
+    job_id = m.command[2]
+    engine = active_broadcasts.get(job_id)
+
+    if action == "dead":
+        job = await Seishiro.get_broadcast_job(job_id)
+        if not job:
+            return await m.reply_text(f"<b>Job <code>{job_id}</code> not found.</b>")
+        dead_users = await Seishiro.get_broadcast_dead_users(job_id)
+        if not dead_users:
+            return await m.reply_text(f"<b>Job <code>{job_id}</code> found no dead users.</b>")
+        report = io.BytesIO("\n".join(f"{dead['user_id']}\t{dead['reason']}" for dead in dead_users).encode())
+        report.name = f"dead_users_{job_id}.txt"
+        return await m.reply_document(report, caption=f"<b>{len(dead_users)} dead user(s) removed by job <code>{job_id}</code></b>")
+
+    if action == "pause":
+        if not await Seishiro.set_broadcast_status(job_id, "paused", expected=["running"]):
+            return await m.reply_text(f"<b>Job <code>{job_id}</code> is not running.</b>")
+        if engine:
+            engine.stop("paused")
+        return await m.reply_text(f"<b>Job <code>{job_id}</code> will pause after the current batch.</b>")
+
+    if action == "cancel":
+        if not await Seishiro.set_broadcast_status(job_id, "cancelled", expected=["running", "paused", "failed"]):
+            return await m.reply_text(f"<b>Job <code>{job_id}</code> cannot be cancelled.</b>")
+        if engine:
+            engine.stop("cancelled")
+        return await m.reply_text(f"<b>Job <code>{job_id}</code> cancelled.</b>")
+
+    # resume
+    if not await Seishiro.set_broadcast_status(job_id, "running", expected=["paused", "failed"]):
+        return await m.reply_text(f"<b>Job <code>{job_id}</code> is not paused.</b>")
+    # The engine may have exited while the status was being written
+    engine = active_broadcasts.get(job_id)
+    if engine:
+        # Still finishing its last batch, just keep it going
+        engine.stop_status = None
+        return await m.reply_text(f"<b>Job <code>{job_id}</code> resumed.</b>")
+    job = await Seishiro.get_broadcast_job(job_id)
+    sts_msg = await m.reply_text(f"Resuming broadcast <code>{job_id}</code> from {job['done']} / {job['total']}...")
+    asyncio.create_task(run_broadcast_job(bot, job, sts_msg))
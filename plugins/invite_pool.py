@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from pyrogram.errors import FloodWait
+from config import *
+from database.database import Seishiro
+from helper_func import get_chat_info
+from cache import SingleFlight, TTLCache
+from plugins.scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class InviteLinkPool:
+    """
+    Per-channel invite links shared by every user inside their expiry window.
+
+    Links are keyed by (chat_id, creates_join_request). A background loop
+    replaces each link `refresh_margin` seconds before it expires, so callers
+    normally get a link from memory without waiting on Telegram. Concurrent
+    misses for the same key share a single create_chat_invite_link call.
+
+    Only links served within the last `idle_after` seconds are rotated; idle
+    ones, and ones whose flavour no longer matches the channel's mode, are
+    dropped and created again on demand. A replaced link is revoked once its
+    own expiry has passed, so users already shown it can still join.
+    """
+
+    def __init__(self, expiry: int, refresh_margin: int, check_interval: int = 15, idle_after: int = None):
+        self.expiry = expiry
+        self.refresh_margin = refresh_margin
+        self.check_interval = check_interval
+        self.idle_after = idle_after or expiry
+        self._links = {}
+        self._served = {}
+        self._inflight = SingleFlight()
+        self.warmed = False
+
+    async def get(self, client, chat_id: int, creates_join_request: bool = False) -> str:
+        key = (chat_id, creates_join_request)
+        self._served[key] = time.monotonic()
+        entry = self._links.get(key)
+        if entry and entry[1] - time.monotonic() > self.check_interval:
+            return entry[0]
+        return await self._refresh(client, key)
+
+    def discard(self, chat_id: int):
+        for key in [key for key in self._links if key[0] == chat_id]:
+            del self._links[key]
+            self._served.pop(key, None)
+
+    async def _retire(self, key):
+        """Forget the link for key and revoke it when it would have expired anyway."""
+        self._served.pop(key, None)
+        entry = self._links.pop(key, None)
+        if entry:
+            await self._schedule_revoke(key, entry)
+
+    async def _schedule_revoke(self, key, entry):
+        link, expires_at = entry
+        chat_id, creates_join_request = key
+        delay = max(0.0, expires_at - time.monotonic()) if self.expiry else 0
+        await scheduler.schedule("revoke_invite", delay, channel_id=chat_id, link=link, is_request=creates_join_request)
+
+    async def _refresh(self, client, key) -> str:
+        return await self._inflight.do(key, lambda: self._create(client, key))
+
+    async def _create(self, client, key) -> str:
+        chat_id, creates_join_request = key
+        invite = await client.create_chat_invite_link(
+            chat_id=chat_id,
+            creates_join_request=creates_join_request,
+            expire_date=datetime.now() + timedelta(seconds=self.expiry) if self.expiry else None
+        )
+        expires_at = time.monotonic() + self.expiry if self.expiry else float("inf")
+        replaced = self._links.get(key)
+        self._links[key] = (invite.invite_link, expires_at)
+        if replaced:
+            await self._schedule_revoke(key, replaced)
+        return invite.invite_link
+
+    async def warm(self, client):
+        """Create a link for every private fsub channel in its current mode."""
+        for chat_id in await Seishiro.get_fsub_channels():
+            try:
+                chat = await get_chat_info(client, chat_id)
+                if chat.username:
+                    continue
+                mode = await Seishiro.get_channel_mode(chat_id)
+                await self.get(client, chat_id, creates_join_request=(mode == "on"))
+            except FloodWait as e:
+                logger.warning("FloodWait while warming invite links: waiting %ss", e.value)
+                await asyncio.sleep(e.value)
+            except Exception as e:
+                logger.warning("Failed to warm invite link for %s: %s", chat_id, e)
+        self.warmed = True
+
+    async def run(self, client):
+        """Warm the pool, then rotate links before they expire, forever."""
+        await self.warm(client)
+        if not self.expiry:
+            return
+        while True:
+            await asyncio.sleep(self.check_interval)
+            fsub_channels = set(await Seishiro.get_fsub_channels())
+            now = time.monotonic()
+            for key, (link, expires_at) in list(self._links.items()):
+                if key[0] not in fsub_channels:
+                    self._links.pop(key, None)
+                    self._served.pop(key, None)
+                    continue
+                if expires_at - now > self.refresh_margin:
+                    continue
+                try:
+                    # Nobody asked for this link lately, or it is the wrong flavour
+                    # since a mode toggle: let it lapse instead of replacing it
+                    mode = await Seishiro.get_channel_mode(key[0])
+                    if key[1] != (mode == "on") or now - self._served.get(key, float("-inf")) > self.idle_after:
+                        await self._retire(key)
+                        logger.debug("Dropped invite link for %s (request=%s)", key[0], key[1])
+                        continue
+                    await self._refresh(client, key)
+                    logger.debug("Rotated invite link for %s (request=%s)", key[0], key[1])
+                except FloodWait as e:
+                    logger.warning("FloodWait while rotating invite links: waiting %ss", e.value)
+                    await asyncio.sleep(e.value)
+                except Exception as e:
+                    logger.warning("Failed to rotate invite link for %s: %s", key[0], e)
+
+
+class ChannelLinkProvider:
+    """
+    The invite link handed out for a deep-link channel.
+
+    A link is reused by every request within `reuse_window` seconds of its
+    creation. Concurrent requests for a channel without a fresh link await
+    one shared in-flight future instead of queueing on a lock, and the future
+    is dropped as soon as it resolves, so idle channels hold no state beyond
+    a bounded, expiring cache entry.
+    """
+
+    def __init__(self, expiry: int = 300, reuse_window: int = 240):
+        self.expiry = expiry
+        self.reuse_window = reuse_window
+        self._links = TTLCache(reuse_window, maxsize=5000)
+        self._inflight = SingleFlight()
+
+    async def get(self, client, channel_id: int, is_request: bool) -> tuple:
+        """Return (invite_link, is_request_link) for channel_id."""
+        cached = self._links.get(channel_id)
+        if cached:
+            return cached
+
+        return await self._inflight.do(channel_id, lambda: self._resolve(client, channel_id, is_request))
+
+    def discard(self, channel_id: int):
+        self._links.pop(channel_id)
+
+    async def _resolve(self, client, channel_id: int, is_request: bool) -> tuple:
+        # Another instance, or this one before a restart, may have a fresh link
+        old_link_info = await Seishiro.get_current_invite_link(channel_id)
+        if old_link_info:
+            channel_data = await Seishiro.get_channel_doc(channel_id)
+            created_at = channel_data.get("invite_link_created_at") if channel_data else None
+            age = (datetime.utcnow() - created_at).total_seconds() if created_at else None
+            if age is not None and age < self.reuse_window:
+                result = (old_link_info["invite_link"], old_link_info["is_request"])
+                self._links.set(channel_id, result, ttl=self.reuse_window - age)
+                logger.debug("Reusing existing link for channel %s", channel_id)
+                return result
+            try:
+                await client.revoke_chat_invite_link(channel_id, old_link_info["invite_link"])
+                logger.debug("Revoked old %s link for channel %s", 'request' if old_link_info['is_request'] else 'invite', channel_id)
+            except Exception as e:
+                logger.warning("Failed to revoke old link for channel %s: %s", channel_id, e)
+
+        invite = await client.create_chat_invite_link(
+            chat_id=channel_id,
+            expire_date=datetime.now() + timedelta(seconds=self.expiry),
+            creates_join_request=is_request
+        )
+        await Seishiro.save_invite_link(channel_id, invite.invite_link, is_request)
+        # One revocation per link, rather than one per user it was shown to
+        await scheduler.schedule("revoke_invite", self.expiry, channel_id=channel_id, link=invite.invite_link, is_request=is_request)
+        logger.debug("Created new %s link for channel %s", 'request' if is_request else 'invite', channel_id)
+
+        result = (invite.invite_link, is_request)
+        self._links.set(channel_id, result)
+        return result
+
+
+class PrimaryLinkRegistry:
+    """
+    The primary invite link of each chat, resolved once and served from memory.
+
+    export_chat_invite_link revokes the chat's primary link and generates a
+    new one, so calling it for every request costs an API call and breaks
+    every primary link handed out earlier. The registry adopts the primary
+    link Telegram already reports for the chat and only exports one when
+    there is none. Links are persisted in Mongo and replaced only by an
+    explicit refresh, or when a fetched chat reports a different primary link.
+    """
+
+    def __init__(self):
+        self._links = {}
+        self._inflight = SingleFlight()
+        self.loaded = False
+
+    async def load(self):
+        self._links.update(await Seishiro.get_primary_links())
+        self.loaded = True
+
+    async def get(self, client, chat_id: int) -> str:
+        link = self._links.get(chat_id)
+        if link:
+            return link
+
+        return await self._inflight.do(chat_id, lambda: self.refresh(client, chat_id))
+
+    async def refresh(self, client, chat_id: int) -> str:
+        """Re-read the chat's primary link from Telegram, exporting one only if it has none."""
+        chat = await get_chat_info(client, chat_id, refresh=True)
+        link = chat.invite_link
+        if not link:
+            link = await client.export_chat_invite_link(chat_id)
+            logger.info("Exported primary invite link for %s", chat_id)
+        await self.observe(chat_id, link)
+        return link
+
+    async def observe(self, chat_id: int, link: str):
+        """Adopt link if it differs from the stored one, e.g. after an admin regenerated it."""
+        if not link or self._links.get(chat_id) == link:
+            return
+        if chat_id in self._links:
+            logger.info("Primary invite link of %s changed, replacing the stored one", chat_id)
+        self._links[chat_id] = link
+        await Seishiro.save_primary_link(chat_id, link)
+
+    async def forget(self, chat_id: int):
+        if self._links.pop(chat_id, None):
+            await Seishiro.delete_primary_link(chat_id)
+
+    def known_chats(self) -> list:
+        return list(self._links)
+
+
+fsub_link_pool = InviteLinkPool(FSUB_LINK_EXPIRY, FSUB_LINK_REFRESH_MARGIN)
+channel_link_provider = ChannelLinkProvider()
+primary_link_registry = PrimaryLinkRegistry()
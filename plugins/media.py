@@ -0,0 +1,79 @@
+import logging
+from pyrogram.errors import FloodWait, FileReferenceExpired, FileIdInvalid, MediaEmpty
+from config import *
+from database.database import Seishiro
+
+logger = logging.getLogger(__name__)
+
+
+class MediaRegistry:
+    """
+    Maps every configured image URL to the Telegram file_id it was uploaded as.
+
+    Sending by file_id lets Telegram reuse its stored copy instead of fetching
+    the URL from the image host on every send. Ids are persisted in Mongo so
+    they survive restarts; an id Telegram rejects is dropped and the URL is
+    sent once more to obtain a fresh one.
+    """
+
+    def __init__(self, urls: list):
+        self.urls = [url for url in urls if url]
+        self._ids = {}
+        self.warmed = False
+
+    def photo(self, url: str) -> str:
+        """The cached file_id for url, or url itself if it has not been uploaded yet."""
+        return self._ids.get(url, url)
+
+    async def remember(self, url: str, message):
+        photo = getattr(message, "photo", None)
+        if not photo or self._ids.get(url) == photo.file_id:
+            return
+        self._ids[url] = photo.file_id
+        await Seishiro.save_media_id(url, photo.file_id)
+
+    async def forget(self, url: str):
+        if self._ids.pop(url, None):
+            await Seishiro.delete_media_id(url)
+
+    async def send(self, url: str, send):
+        """
+        Call send(photo) with the cached file_id for url, falling back to the URL.
+
+        Args:
+            url: Configured image URL
+            send: Callable taking the photo argument and returning the sent Message
+
+        Returns:
+            The Message returned by send
+        """
+        if url in self._ids:
+            try:
+                return await send(self._ids[url])
+            except (FileReferenceExpired, FileIdInvalid, MediaEmpty, ValueError) as e:
+                logger.warning("Cached file_id for %s was rejected, re-uploading: %s", url, e)
+                await self.forget(url)
+        message = await send(url)
+        await self.remember(url, message)
+        return message
+
+    async def load(self):
+        self._ids.update(await Seishiro.get_media_ids())
+
+    async def warm(self, client):
+        """Upload every configured image that has no file_id yet via DATABASE_CHANNEL."""
+        for url in self.urls:
+            if url in self._ids:
+                continue
+            try:
+                message = await client.send_photo(DATABASE_CHANNEL, url, disable_notification=True)
+                await self.remember(url, message)
+                await message.delete()
+            except FloodWait as e:
+                logger.warning("FloodWait while uploading %s, will use the URL for now: %ss", url, e.value)
+            except Exception as e:
+                logger.warning("Failed to upload %s: %s", url, e)
+        self.warmed = True
+
+
+media_registry = MediaRegistry([START_PIC, FSUB_PIC, SETTINGS_PIC, APPROVE_PIC, RESTART_PIC])
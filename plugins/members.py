@@ -0,0 +1,46 @@
+import logging
+from bot import Bot
+from pyrogram.enums import ChatMemberStatus
+from pyrogram.types import ChatMemberUpdated, ChatJoinRequest
+from database.database import Seishiro
+from helper_func import *
+
+logger = logging.getLogger(__name__)
+
+MEMBER_STATUSES = {
+    ChatMemberStatus.OWNER,
+    ChatMemberStatus.ADMINISTRATOR,
+    ChatMemberStatus.MEMBER
+}
+
+# Keep the fsub membership table in sync so check_fsub rarely needs get_chat_member
+@Bot.on_chat_member_updated(group=1)
+async def track_fsub_membership(client: Bot, update: ChatMemberUpdated):
+    chat_id = update.chat.id
+    if chat_id not in await Seishiro.get_fsub_channels():
+        return
+
+    member = update.new_chat_member or update.old_chat_member
+    if not member or not member.user:
+        return
+
+    user_id = member.user.id
+    is_member = bool(update.new_chat_member) and update.new_chat_member.status in MEMBER_STATUSES
+    await Seishiro.set_member_status(chat_id, user_id, is_member)
+    invalidate_membership(user_id, chat_id)
+
+    # Joining or leaving settles any pending join request
+    await Seishiro.del_req_user(chat_id, user_id)
+    logger.debug("Membership of %s in %s is now %s", user_id, chat_id, is_member)
+
+# Request-mode fsub counts a pending join request as subscribed
+@Bot.on_chat_join_request(group=1)
+async def track_fsub_join_request(client: Bot, request: ChatJoinRequest):
+    chat_id = request.chat.id
+    if chat_id not in await Seishiro.get_fsub_channels():
+        return
+
+    user_id = request.from_user.id
+    await Seishiro.req_user(chat_id, user_id)
+    invalidate_membership(user_id, chat_id)
+    logger.debug("Recorded join request of %s for %s", user_id, chat_id)
@@ -0,0 +1,35 @@
+from pyrogram import filters
+from pyrogram.enums import ParseMode
+from pyrogram.types import Message
+from bot import Bot
+from config import *
+from metrics import PERF, PHASES
+
+
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.0f}" if seconds >= 0.01 else f"{seconds * 1000:.1f}"
+
+def render_perf() -> str:
+    """p50/p95/p99 per handler and phase over the last 5-10 minutes, in milliseconds."""
+    rows = []
+    for name, histograms in sorted(PERF.items(), key=lambda item: -item[1]["total"].percentile(0.95)):
+        count = histograms["total"].count
+        if not count:
+            continue
+        rows.append(f"{name} (n={count})")
+        for phase in PHASES:
+            histogram = histograms[phase]
+            rows.append(
+                f"  {phase:<6}"
+                f"{format_ms(histogram.percentile(0.50)):>8}"
+                f"{format_ms(histogram.percentile(0.95)):>8}"
+                f"{format_ms(histogram.percentile(0.99)):>8}"
+            )
+    if not rows:
+        return "<b>Nᴏ ʜᴀɴᴅʟᴇʀ ᴛɪᴍɪɴɢs ʀᴇᴄᴏʀᴅᴇᴅ ʏᴇᴛ.</b>"
+    header = f"{'':<8}{'p50':>8}{'p95':>8}{'p99':>8}"
+    return "<b>Hᴀɴᴅʟᴇʀ ʟᴀᴛᴇɴᴄʏ (ms, ʟᴀsᴛ 5-10 ᴍɪɴ)</b>\n<pre>" + "\n".join([header] + rows) + "</pre>"
+
+@Bot.on_message(filters.command("perf") & filters.private & filters.user(OWNER_ID))
+async def perf_command(client: Bot, message: Message):
+    await message.reply_text(render_perf(), parse_mode=ParseMode.HTML)
@@ -1,7 +1,66 @@
+import asyncio
+import time
 from aiohttp import web
+from config import HEALTH_PROBE_TIMEOUT
+from database.database import Seishiro
+from metrics import render
+from plugins.invite_pool import fsub_link_pool
+from plugins.media import media_registry
+from plugins.scheduler import scheduler
 
 routes = web.RouteTableDef()
 
+STARTED_AT = time.monotonic()
+
 @routes.get("/", allow_head=True)
 async def root_route_handler(request):
     return web.json_response("RexBots - Abhi,Master,Seishiro")
+
+@routes.get("/metrics")
+async def metrics_route_handler(request):
+    return web.Response(
+        body=render().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+    )
+
+@routes.get("/healthz", allow_head=True)
+async def healthz_route_handler(request):
+    # Answering at all means the event loop is alive
+    return web.json_response({"status": "ok", "uptime_seconds": round(time.monotonic() - STARTED_AT, 1)})
+
+async def probe(check) -> dict:
+    """Run one dependency check with a timeout and report its latency."""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(check(), HEALTH_PROBE_TIMEOUT)
+        result = {"ok": True}
+    except asyncio.TimeoutError:
+        result = {"ok": False, "error": f"timed out after {HEALTH_PROBE_TIMEOUT}s"}
+    except Exception as e:
+        result = {"ok": False, "error": str(e)}
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+@routes.get("/readyz", allow_head=True)
+async def readyz_route_handler(request):
+    bot = request.app["bot"]
+    started = bool(bot and bot.started)
+
+    checks = {"mongo": await probe(Seishiro.ping)}
+    if started:
+        checks["telegram"] = await probe(bot.get_me)
+    else:
+        checks["telegram"] = {"ok": False, "error": "bot not started"}
+
+    warmup = {
+        "started": started,
+        "indexes": bool(bot and bot.indexes_ready),
+        "scheduler_loaded": scheduler.loaded,
+        "invite_links_warmed": fsub_link_pool.warmed,
+        "media_warmed": media_registry.warmed,
+    }
+    ready = started and all(check["ok"] for check in checks.values())
+    return web.json_response(
+        {"status": "ready" if ready else "not_ready", "checks": checks, "warmup": warmup},
+        status=200 if ready else 503
+    )
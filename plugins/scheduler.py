@@ -0,0 +1,189 @@
+import asyncio
+import heapq
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pyrogram.errors import FloodWait
+from config import *
+from database.database import Seishiro
+from metrics import CallbackMetric
+
+logger = logging.getLogger(__name__)
+
+
+class JobScheduler:
+    """
+    Durable delayed jobs (message deletes, invite revocations).
+
+    Every job is written to the 'scheduled_jobs' collection and pushed onto an
+    in-memory min-heap ordered by run_at. A single timer loop sleeps until the
+    earliest job is due, so pending jobs cost a heap entry rather than a
+    sleeping task. On startup the collection is reloaded and anything that
+    came due while the bot was down runs immediately.
+
+    Kinds registered with a batch window are coalesced: when one such job is
+    due, every job of that kind due within the window is taken with it and
+    the handler receives the list of payloads.
+    """
+
+    def __init__(self, concurrency: int = 10):
+        self._heap = []
+        self._queued = set()
+        self._handlers = {}
+        self._batch_windows = {}
+        self._wakeup = asyncio.Event()
+        self._running = set()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.loaded = False
+
+    def handler(self, kind: str, batch_window: float = None):
+        """
+        Register the coroutine that executes jobs of `kind`.
+
+        Args:
+            kind: Job kind passed to schedule()
+            batch_window: If set, the handler is called with a list of payloads
+                for all jobs of this kind due within this many seconds
+        """
+        def decorator(func):
+            self._handlers[kind] = func
+            if batch_window is not None:
+                self._batch_windows[kind] = batch_window
+            return func
+        return decorator
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def _push(self, run_at: datetime, job_id: str, kind: str, payload: dict):
+        if job_id in self._queued:
+            return
+        self._queued.add(job_id)
+        heapq.heappush(self._heap, (run_at, job_id, kind, payload))
+        if self._heap[0][1] == job_id:
+            self._wakeup.set()
+
+    async def schedule(self, kind: str, delay: float, **payload) -> str:
+        """Run handler `kind` with `payload` after `delay` seconds, surviving restarts."""
+        run_at = datetime.utcnow() + timedelta(seconds=delay)
+        job_id = await Seishiro.add_scheduled_job(kind, run_at, payload)
+        self._push(run_at, job_id, kind, payload)
+        return job_id
+
+    async def load(self) -> int:
+        jobs = await Seishiro.get_scheduled_jobs()
+        for job in jobs:
+            self._push(job["run_at"], job["_id"], job["kind"], job.get("payload", {}))
+        self.loaded = True
+        return len(jobs)
+
+    def _pop_batch(self, kind: str, window: float) -> list:
+        """Pop every job of `kind` due within `window` seconds; other jobs stay queued."""
+        horizon = datetime.utcnow() + timedelta(seconds=window)
+        batch, others = [], []
+        while self._heap and self._heap[0][0] <= horizon:
+            entry = heapq.heappop(self._heap)
+            (batch if entry[2] == kind else others).append(entry)
+        for entry in others:
+            heapq.heappush(self._heap, entry)
+        for _, job_id, _, _ in batch:
+            self._queued.discard(job_id)
+        return [(job_id, payload) for _, job_id, _, payload in batch]
+
+    async def _execute(self, client, kind: str, jobs: list):
+        func = self._handlers.get(kind)
+        job_ids = [job_id for job_id, _ in jobs]
+        try:
+            if func is None:
+                logger.warning("No handler for scheduled jobs %s of kind %s, dropping them", job_ids, kind)
+            elif kind in self._batch_windows:
+                await func(client, [payload for _, payload in jobs])
+            else:
+                await func(client, **jobs[0][1])
+        except FloodWait as e:
+            run_at = datetime.utcnow() + timedelta(seconds=e.value)
+            await Seishiro.reschedule_jobs(job_ids, run_at)
+            for job_id, payload in jobs:
+                self._push(run_at, job_id, kind, payload)
+            return
+        except Exception as e:
+            logger.warning("Scheduled %s jobs %s failed: %s", kind, job_ids, e)
+        finally:
+            self._semaphore.release()
+        await Seishiro.delete_scheduled_jobs(job_ids)
+
+    async def run(self, client):
+        """Reload persisted jobs, then run each one when it comes due, forever."""
+        loaded = await self.load()
+        logger.info("Loaded %s scheduled jobs", loaded)
+        while True:
+            self._wakeup.clear()
+            if self._heap:
+                timeout = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+                if timeout <= 0:
+                    # Bound in-flight jobs so a backlog of overdue ones is drained gradually
+                    await self._semaphore.acquire()
+                    kind = self._heap[0][2]
+                    if kind in self._batch_windows:
+                        jobs = self._pop_batch(kind, self._batch_windows[kind])
+                    else:
+                        _, job_id, kind, payload = heapq.heappop(self._heap)
+                        self._queued.discard(job_id)
+                        jobs = [(job_id, payload)]
+                    task = asyncio.create_task(self._execute(client, kind, jobs))
+                    self._running.add(task)
+                    task.add_done_callback(self._running.discard)
+                    continue
+            else:
+                timeout = None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+scheduler = JobScheduler(SCHEDULER_CONCURRENCY)
+
+CallbackMetric("linkshare_scheduled_jobs_pending", "Scheduled jobs waiting to run", callback=lambda: {(): scheduler.pending})
+
+
+# Telegram accepts at most this many message IDs per delete_messages call
+DELETE_CHUNK_SIZE = 100
+
+
+@scheduler.handler("delete_message", batch_window=DELETE_BATCH_WINDOW)
+async def delete_messages(client, jobs: list):
+    """Delete due messages with one delete_messages call per chat, falling back to single deletes."""
+    by_chat = defaultdict(list)
+    for job in jobs:
+        by_chat[job["chat_id"]].append(job["message_id"])
+
+    for chat_id, message_ids in by_chat.items():
+        for i in range(0, len(message_ids), DELETE_CHUNK_SIZE):
+            chunk = message_ids[i:i + DELETE_CHUNK_SIZE]
+            try:
+                await client.delete_messages(chat_id, chunk)
+            except FloodWait:
+                raise
+            except Exception as e:
+                logger.debug("Bulk delete of %s messages in %s failed, deleting one by one: %s", len(chunk), chat_id, e)
+                for message_id in chunk:
+                    try:
+                        await client.delete_messages(chat_id, message_id)
+                    except FloodWait:
+                        raise
+                    except Exception:
+                        pass
+
+
+@scheduler.handler("revoke_invite")
+async def revoke_invite(client, channel_id: int, link: str, is_request: bool = False):
+    """Revoke an invite link once it has been shared for a while."""
+    try:
+        await client.revoke_chat_invite_link(channel_id, link)
+        logger.debug("Revoked %s link for channel %s", "join request" if is_request else "invite", channel_id)
+    except FloodWait:
+        raise
+    except Exception as e:
+        logger.warning("Failed to revoke invite link for channel %s: %s", channel_id, e)
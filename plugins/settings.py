@@ -1,8 +1,9 @@
 import asyncio
 import base64
+import logging
 import re, time
 from datetime import date, datetime, timedelta
-from bot import Bot
+from bot import Bot, api_governor
 from pyrogram import Client, filters
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message, InputMediaPhoto
 from pyrogram.errors import UserNotParticipant, FloodWait, ChatAdminRequired, RPCError, PeerIdInvalid
@@ -10,25 +11,21 @@ from pyrogram.errors import InviteHashExpired, InviteRequestSent
 from database.database import Seishiro
 from config import *
 from helper_func import *
+from plugins.media import media_registry
+from plugins.invite_pool import primary_link_registry
+from metrics import track_handler
 from pyrogram.enums import ParseMode, ChatMemberStatus
 
-PAGE_SIZE = 6
+logger = logging.getLogger(__name__)
 
-# Revoke invite link after 5 minutes
-async def revoke_invite_after_5_minutes(client: Bot, channel_id: int, link: str, is_request: bool = False):
-    await asyncio.sleep(300)
-    try:
-        await client.revoke_chat_invite_link(channel_id, link)
-        print(f"{'Jᴏɪɴ ʀᴇǫᴜᴇsᴛ' if is_request else 'Iɴᴠɪᴛᴇ'} ʟɪɴᴋ ʀᴇᴠᴏᴋᴇᴅ ғᴏʀ ᴄʜᴀɴɴᴇʟ {channel_id}")
-    except Exception as e:
-        print(f"Fᴀɪʟᴇᴅ ᴛᴏ ʀᴇᴠᴏᴋᴇ ɪɴᴠɪᴛᴇ ғᴏʀ ᴄʜᴀɴɴᴇʟ {channel_id}: {e}")
+PAGE_SIZE = 6
 
 async def is_owner_or_admin(filter, client, message):
     try:
         user_id = message.from_user.id
         return any([user_id == OWNER_ID, await Seishiro.is_admin(user_id)])
     except Exception as e:
-        logger.error(f"Exception in check_admin: {e}")
+        logger.error("Exception in check_admin: %s", e)
         return False
         
 is_owner_or_admin = filters.create(is_owner_or_admin)
@@ -38,13 +35,14 @@ async def is_admin_user(filter, client, message):
         user_id = message.from_user.id
         return any([user_id == OWNER_ID, await Seishiro.is_admin(user_id)])
     except Exception as e:
-        logger.error(f"Exception in check_admin: {e}")
+        logger.error("Exception in check_admin: %s", e)
         return False
 
 is_admin_user = filters.create(is_admin_user)
 
 # Settings command to show the main menu
 @Bot.on_message(filters.command('settings') & filters.private & is_owner_or_admin)
+@track_handler
 async def settings_command(client: Client, message: Message):
     try:
         keyboard = InlineKeyboardMarkup([
@@ -53,21 +51,22 @@ async def settings_command(client: Client, message: Message):
             [InlineKeyboardButton("Vɪᴇᴡ sᴛᴀᴛᴜs", callback_data="status")],
             [InlineKeyboardButton("• Cʟᴏsᴇ •", callback_data="close")]
         ])
-        await message.reply_photo(
-            photo="https://files.catbox.moe/i7wwxi.jpg",
+        await media_registry.send(SETTINGS_PIC, lambda photo: message.reply_photo(
+            photo=photo,
             caption="<b>Hᴇʏ ᴅᴜᴅᴇ...!!</b>\n <blockquote><b><i>Iᴛ's ᴀ ᴘᴏᴡᴇʀғᴜʟ sᴇᴛᴛɪɴɢs ᴍᴇɴᴜ ᴏғ ʟɪɴᴋ sʜᴀʀᴇ ʙᴏᴛ Iɴ ᴛʜɪs ʏᴏᴜ ᴄᴀɴ ᴄʜᴀɴɢᴇ ʏᴏᴜʀ sᴇᴛᴛɪɴɢs ᴇᴀsɪʟʏ ᴡɪᴛʜᴏᴜᴛ ᴀɴʏ ᴍɪsᴛᴀᴋᴇ.</i></b></blockquote>",
             reply_markup=keyboard
-        )
+        ))
     except Exception as e:
-        logger.error(f"Error in settings command: {e}")
+        logger.error("Error in settings command: %s", e)
         await message.reply_text("An error occurred while opening the settings menu. Please try again later.")
         
 # Callback query handler for settings
 @Bot.on_callback_query()
+@track_handler
 async def settings_callback(client: Bot, callback_query):
     user_id = callback_query.from_user.id
     cb_data = callback_query.data
-    print(f"Callback received: {cb_data} from user {user_id}")
+    logger.debug("Callback %s from user %s", cb_data, user_id)
 
     try:
         is_admin_user = user_id == OWNER_ID or await Seishiro.is_admin(user_id)
@@ -80,11 +79,11 @@ async def settings_callback(client: Bot, callback_query):
                 [InlineKeyboardButton("Vɪᴇᴡ sᴛᴀᴛᴜs", callback_data="view_status")],
                 [InlineKeyboardButton("• Cʟᴏsᴇ •", callback_data="close")]
             ])
-            await callback_query.edit_message_media(
+            await media_registry.send(SETTINGS_PIC, lambda photo: callback_query.edit_message_media(
                 InputMediaPhoto(
-                    "https://files.catbox.moe/i7wwxi.jpg",
+                    photo,
                     "<b>Hᴇʏ ᴅᴜᴅᴇ...!!</b>\n <blockquote><b><i>Iᴛ's ᴀ ᴘᴏᴡᴇʀғᴜʟ sᴇᴛᴛɪɴɢs ᴍᴇɴᴜ ᴏғ ʟɪɴᴋ sʜᴀʀᴇ ʙᴏᴛ Iɴ ᴛʜɪs ʏᴏᴜ ᴄᴀɴ ᴄʜᴀɴɢᴇ ʏᴏᴜʀ sᴇᴛᴛɪɴɢs ᴇᴀsɪʟʏ ᴡɪᴛʜᴏᴜᴛ ᴀɴʏ ᴍɪsᴛᴀᴋᴇ.</i></b></blockquote>"),
-                reply_markup=keyboard)
+                reply_markup=keyboard))
 
         elif cb_data == "close":
             await callback_query.message.delete()
@@ -108,25 +107,27 @@ async def settings_callback(client: Bot, callback_query):
             uptime_delta = current_time - client.uptime
             uptime_seconds = uptime_delta.total_seconds()
             uptime = time.strftime("%Hh%Mm%Ss", time.gmtime(uptime_seconds))
-            await callback_query.answer(f"•Bᴏᴛ ᴜᴘᴛɪᴍᴇ: {uptime}\n•Tᴏᴛᴀʟ ᴜsᴇʀs: {total_users}\n•Vᴇʀsɪᴏɴ: 2.05v", show_alert=True)
+            member_hits = f"{membership_cache.hit_ratio:.0%}"
+            api_wait = f"{api_governor.total_wait:.1f}s"
+            await callback_query.answer(f"•Bᴏᴛ ᴜᴘᴛɪᴍᴇ: {uptime}\n•Tᴏᴛᴀʟ ᴜsᴇʀs: {total_users}\n•Fsᴜʙ ᴄᴀᴄʜᴇ ʜɪᴛs: {member_hits}\n•Aᴘɪ ǫᴜᴇᴜᴇ ᴡᴀɪᴛ: {api_wait}\n•Vᴇʀsɪᴏɴ: 2.05v", show_alert=True)
             
         elif cb_data == "about":
             user = await client.get_users(OWNER_ID)
-            await callback_query.edit_message_media(
+            await media_registry.send(SETTINGS_PIC, lambda photo: callback_query.edit_message_media(
                 InputMediaPhoto(
-                    "https://files.catbox.moe/i7wwxi.jpg",
+                    photo,
                     ABOUT_TXT
                 ),
                 reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton('• ʙᴀᴄᴋ', callback_data='start'), 
+                    [InlineKeyboardButton('• ʙᴀᴄᴋ', callback_data='start'),
                      InlineKeyboardButton('ᴄʟᴏsᴇ •', callback_data='close')]
                 ])
-            )
+            ))
 
         elif cb_data == "help":
-            await callback_query.edit_message_media(
+            await media_registry.send(SETTINGS_PIC, lambda photo: callback_query.edit_message_media(
                 InputMediaPhoto(
-                    "https://files.catbox.moe/i7wwxi.jpg",
+                    photo,
                     HELP_TXT.format(
                         first=callback_query.from_user.first_name,
                         last=callback_query.from_user.last_name or "",
@@ -134,10 +135,10 @@ async def settings_callback(client: Bot, callback_query):
                         mention=callback_query.from_user.mention,
                         id=callback_query.from_user.id)),
                 reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton('• ʙᴀᴄᴋ', callback_data='start'), 
+                    [InlineKeyboardButton('• ʙᴀᴄᴋ', callback_data='start'),
                      InlineKeyboardButton('ᴄʟᴏsᴇ •', callback_data='close')]
                 ])
-            )
+            ))
         
         elif cb_data == "start":
             user_id = callback_query.from_user.id
@@ -169,17 +170,17 @@ async def settings_callback(client: Bot, callback_query):
                 )
                 
             try:
-                await callback_query.edit_message_media(
-                    InputMediaPhoto(START_PIC, START_MSG.format(
+                await media_registry.send(START_PIC, lambda photo: callback_query.edit_message_media(
+                    InputMediaPhoto(photo, START_MSG.format(
                         first=callback_query.from_user.first_name,
                         last=callback_query.from_user.last_name or "",
                         username=f"@{callback_query.from_user.username}" if callback_query.from_user.username else "None",
                         mention=callback_query.from_user.mention,
                         id=callback_query.from_user.id)),
                     reply_markup=inline_buttons
-                )
+                ))
             except Exception as e:
-                print(f"Error sending start/home photo: {e}")
+                logger.error("Error sending start/home photo: %s", e)
                 await callback_query.edit_message_text(
                     START_MSG.format(
                         first=callback_query.from_user.first_name,
@@ -244,15 +245,7 @@ async def settings_callback(client: Bot, callback_query):
                 
                 ban_user_id = int(user_id_str)
                 
-                await Seishiro.ban_data.update_one(
-                    {"_id": ban_user_id},
-                    {"$set": {
-                        "ban_status.is_banned": True,
-                        "ban_status.ban_reason": reason,
-                        "ban_status.banned_on": date.today().isoformat()
-                    }},
-                    upsert=True
-                )
+                await Seishiro.ban_user(ban_user_id, reason)
                 
                 await msg.reply(
                     f"<b>Usᴇʀ - `{ban_user_id}` Is sᴜᴄᴄᴇssғᴜʟʟʏ ʙᴀɴɴᴇᴅ. Success\nRᴇᴀsᴏɴ:- {reason}</b>",
@@ -264,7 +257,7 @@ async def settings_callback(client: Bot, callback_query):
                     reply_markup=InlineKeyboardMarkup(btn)
                 )
             except Exception as e:
-                print(f"Error banning user: {e}")
+                logger.error("Error banning user: %s", e)
                 await msg.reply(f"Uɴᴇxᴘᴇᴄᴛᴇᴅ Eʀʀᴏʀ: {str(e)}", reply_markup=InlineKeyboardMarkup(btn))
 
         # Unban User
@@ -296,16 +289,7 @@ async def settings_callback(client: Bot, callback_query):
                 
                 unban_user_id = int(msg.text)
                 
-                result = await Seishiro.ban_data.update_one(
-                    {"_id": unban_user_id},
-                    {"$set": {
-                        "ban_status.is_banned": False,
-                        "ban_status.ban_reason": "",
-                        "ban_status.banned_on": None
-                    }}
-                )
-                
-                if result.matched_count == 0:
+                if not await Seishiro.unban_user(unban_user_id):
                     await msg.reply(
                         f"<b>Usᴇʀ - `{unban_user_id}` ɴᴏᴛ ғᴏᴜɴᴅ ɪɴ ᴅᴀᴛᴀʙᴀsᴇ.</b>",
                         reply_markup=InlineKeyboardMarkup(btn)
@@ -321,7 +305,7 @@ async def settings_callback(client: Bot, callback_query):
                     reply_markup=InlineKeyboardMarkup(btn)
                 )
             except Exception as e:
-                print(f"Error unbanning user: {e}")
+                logger.error("Error unbanning user: %s", e)
                 await msg.reply(f"Uɴᴇxᴘᴇᴄᴛᴇᴅ Eʀʀᴏʀ: {str(e)}", reply_markup=InlineKeyboardMarkup(btn))
 
         # Banned List - FIXED: Removed reply_markup from answer()
@@ -375,7 +359,7 @@ async def settings_callback(client: Bot, callback_query):
             
             btn = [
                 [InlineKeyboardButton("Aᴅᴅ Cʜᴀɴɴᴇʟ", callback_data="add_fsub_channel"), InlineKeyboardButton("Rᴇᴍᴏᴠᴇ Cʜᴀɴɴᴇʟ", callback_data="delete_fsub_channel")],
-                [InlineKeyboardButton("Lɪsᴛ Cʜᴀɴɴᴇʟs", callback_data="list_fsub_channels")],
+                [InlineKeyboardButton("Lɪsᴛ Cʜᴀɴɴᴇʟs", callback_data="list_fsub_channels"), InlineKeyboardButton("Rᴇғʀᴇsʜ Lɪɴᴋs", callback_data="refresh_primary_links")],
                 [InlineKeyboardButton("Tᴏᴏɢʟᴇ Rᴇǫ A", callback_data="fsub_all_channels"), InlineKeyboardButton("Tᴏᴏɢʟᴇ Rᴇǫ B", callback_data="fsub_particular")],
                 [InlineKeyboardButton("back", callback_data="settings_main")]
             ]
@@ -468,7 +452,7 @@ async def settings_callback(client: Bot, callback_query):
             buttons = []
             for cid in channels:
                 try:
-                    chat = await client.get_chat(cid)
+                    chat = await get_chat_info(client, cid)
                     mode = await Seishiro.get_channel_mode(cid)
                     status = "ON" if mode == "on" else "OFF"
                     buttons.append([InlineKeyboardButton(
@@ -476,7 +460,7 @@ async def settings_callback(client: Bot, callback_query):
                         callback_data=f"rfs_ch_{cid}"
                     )])
                 except Exception as e:
-                    print(f"Error fetching channel {cid}: {e}")
+                    logger.warning("Error fetching channel %s: %s", cid, e)
                     continue
 
             buttons.append([InlineKeyboardButton("back", callback_data="fsub_settings_menu")])
@@ -490,7 +474,7 @@ async def settings_callback(client: Bot, callback_query):
         elif cb_data.startswith("rfs_ch_"):
             cid = int(cb_data.split("_")[2])
             try:
-                chat = await client.get_chat(cid)
+                chat = await get_chat_info(client, cid)
                 mode = await Seishiro.get_channel_mode(cid)
                 status = "ON" if mode == "on" else "OFF"
                 new_mode = "off" if mode == "on" else "on"
@@ -519,7 +503,7 @@ async def settings_callback(client: Bot, callback_query):
             await callback_query.answer(f"Force-Sub set to {'ON' if mode == 'on' else 'OFF'}")
 
             # Refresh the channel's mode view
-            chat = await client.get_chat(cid)
+            chat = await get_chat_info(client, cid)
             status = "ON" if mode == "on" else "OFF"
             new_mode = "off" if mode == "on" else "on"
             buttons = [
@@ -589,7 +573,7 @@ async def settings_callback(client: Bot, callback_query):
                             reply_markup=InlineKeyboardMarkup(btn)
                         )
                         return
-                    print(f"RPC Error checking membership for channel {channel_id}: {e}")
+                    logger.warning("RPC error checking membership for channel %s: %s", channel_id, e)
                     await temp.edit(
                         f"<b><blockquote expandable>Fᴀɪʟᴇᴅ ᴛᴏ ᴠᴇʀɪғʏ ᴍᴇᴍʙᴇʀsʜɪᴘ. Eʀʀᴏʀ: {str(e)}.</blockquote></b>",
                         reply_markup=InlineKeyboardMarkup(btn)
@@ -598,9 +582,9 @@ async def settings_callback(client: Bot, callback_query):
                 
                 # Fetch chat details
                 try:
-                    chat = await client.get_chat(channel_id)
+                    chat = await get_chat_info(client, channel_id, refresh=True)
                 except RPCError as e:
-                    print(f"Error fetching chat {channel_id}: {e}")
+                    logger.warning("Error fetching chat %s: %s", channel_id, e)
                     await temp.edit(
                         f"<b><blockquote expandable>Fᴀɪʟᴇᴅ ᴛᴏ ᴀᴄᴄᴇss ᴄʜᴀɴɴᴇʟ. Eʀʀᴏʀ: {str(e)}.</blockquote></b>",
                         reply_markup=InlineKeyboardMarkup(btn)
@@ -609,7 +593,7 @@ async def settings_callback(client: Bot, callback_query):
                 
                 # Get invite link
                 try:
-                    link = await client.export_chat_invite_link(chat.id)
+                    link = await primary_link_registry.get(client, chat.id)
                 except Exception:
                     link = f"https://t.me/{chat.username}" if chat.username else f"https://t.me/c/{str(chat.id)[4:]}"
                 
@@ -629,7 +613,7 @@ async def settings_callback(client: Bot, callback_query):
                     reply_markup=InlineKeyboardMarkup(btn)
                 )
             except Exception as e:
-                print(f"Error adding fsub channel: {e}")
+                logger.error("Error adding fsub channel: %s", e)
                 await temp.edit(
                     f"<b>Failed to add channel:</b>\n<code>{channel_id}</code>\n\n<i>{e}</i>",
                     reply_markup=InlineKeyboardMarkup(btn)
@@ -667,7 +651,7 @@ async def settings_callback(client: Bot, callback_query):
                     reply_markup=InlineKeyboardMarkup(btn)
                 )
             except Exception as e:
-                print(f"Error deleting channel {msg.text}: {e}")
+                logger.error("Error deleting channel %s: %s", msg.text, e)
                 await msg.reply(f"Unexpected Error: {str(e)}", reply_markup=InlineKeyboardMarkup(btn))
 
         # List Fsub Channels - NEW FEATURE
@@ -694,14 +678,15 @@ async def settings_callback(client: Bot, callback_query):
                 
                 for idx, channel_id in enumerate(fsub_channels, 1):
                     try:
-                        chat = await client.get_chat(channel_id)
+                        chat = await get_chat_info(client, channel_id)
                         mode = await Seishiro.get_channel_mode(channel_id)
                         status_emoji = "ON" if mode == "on" else "OFF"
                         status_text = "Rᴇǫᴜᴇsᴛ ON" if mode == "on" else "Rᴇǫᴜᴇsᴛ OFF"
                         
                         # Try to get invite link
                         try:
-                            link = await client.export_chat_invite_link(chat.id)
+                            await primary_link_registry.observe(chat.id, chat.invite_link)
+                            link = await primary_link_registry.get(client, chat.id)
                             fsub_list += f"{idx}. <a href='{link}'>{chat.title}</a> {status_emoji}\n"
                         except:
                             if chat.username:
@@ -713,7 +698,7 @@ async def settings_callback(client: Bot, callback_query):
                         fsub_list += f"    <code>{channel_id}</code> - {status_text}\n\n"
                         
                     except Exception as e:
-                        print(f"Error fetching channel {channel_id}: {e}")
+                        logger.warning("Error fetching channel %s: %s", channel_id, e)
                         fsub_list += f"{idx}. <code>{channel_id}</code> (Error fetching info)\n\n"
                 
                 fsub_list += f"<b>Tᴏᴛᴀʟ Fsᴜʙ Cʜᴀɴɴᴇʟs: {len(fsub_channels)}</b>\n"
@@ -731,6 +716,29 @@ async def settings_callback(client: Bot, callback_query):
                     reply_markup=InlineKeyboardMarkup(btn)
                 )
 
+        # Refresh Primary Invite Links
+        elif cb_data == "refresh_primary_links":
+            if not is_admin_user:
+                await callback_query.answer("Only admins can refresh links!", show_alert=True)
+                return
+
+            await callback_query.answer("Rᴇғʀᴇsʜɪɴɢ ɪɴᴠɪᴛᴇ ʟɪɴᴋs...")
+            btn = [[InlineKeyboardButton("back", callback_data="fsub_settings_menu")]]
+            chat_ids = set(await Seishiro.get_fsub_channels()) | set(primary_link_registry.known_chats())
+            refreshed, failed = 0, 0
+            for chat_id in chat_ids:
+                try:
+                    await primary_link_registry.refresh(client, chat_id)
+                    refreshed += 1
+                except Exception as e:
+                    logger.warning("Error refreshing primary invite link for %s: %s", chat_id, e)
+                    failed += 1
+
+            await callback_query.message.edit_text(
+                f"<b><blockquote expandable>Pʀɪᴍᴀʀʏ ɪɴᴠɪᴛᴇ ʟɪɴᴋs ʀᴇғʀᴇsʜᴇᴅ: {refreshed}\nFᴀɪʟᴇᴅ: {failed}</blockquote></b>",
+                reply_markup=InlineKeyboardMarkup(btn)
+            )
+
         # Admin Panel
         elif cb_data == "admin_bna_system":
             if not is_admin_user:
@@ -846,7 +854,7 @@ async def settings_callback(client: Bot, callback_query):
                     return
                                     
                 try:
-                    chat = await client.get_chat(channel_id)
+                    chat = await get_chat_info(client, channel_id, refresh=True)
                 except RPCError as e:
                     await temp.edit(
                         f"<b><blockquote expandable>Fᴀɪʟᴇᴅ ᴛᴏ ᴀᴄᴄᴇss ᴄʜᴀɴɴᴇʟ: {str(e)}</blockquote></b>",
@@ -874,7 +882,7 @@ async def settings_callback(client: Bot, callback_query):
                     reply_markup=InlineKeyboardMarkup(btn)
                 )
             except Exception as e:
-                print(f"Unexpected Error adding channel: {e}")
+                logger.error("Unexpected error adding channel: %s", e)
                 await temp.edit(f"Unexpected Error: {str(e)}", reply_markup=InlineKeyboardMarkup(btn))
         
         # Delete Channel
@@ -909,7 +917,7 @@ async def settings_callback(client: Bot, callback_query):
                     reply_markup=InlineKeyboardMarkup(btn)
                 )
             except Exception as e:
-                print(f"Error deleting channel {msg.text}: {e}")
+                logger.error("Error deleting channel %s: %s", msg.text, e)
                 await msg.reply(f"Unexpected Error: {str(e)}", reply_markup=InlineKeyboardMarkup(btn))
                 
         elif cb_data == "channel_links":
@@ -918,7 +926,7 @@ async def settings_callback(client: Bot, callback_query):
                 return
                 
             channels = await Seishiro.get_channels()
-            print(f"DEBUG: Found {len(channels)} channels for normal links: {channels}")
+            logger.debug("Found %d channels for normal links", len(channels))
             
             if not channels:
                 await callback_query.message.edit_text(
@@ -937,7 +945,7 @@ async def settings_callback(client: Bot, callback_query):
                 return
                 
             channels = await Seishiro.get_channels()
-            print(f"DEBUG: Found {len(channels)} channels for request links: {channels}")
+            logger.debug("Found %d channels for request links", len(channels))
             
             if not channels:
                 await callback_query.message.edit_text(
@@ -1014,7 +1022,7 @@ async def settings_callback(client: Bot, callback_query):
                     reply_markup=InlineKeyboardMarkup(btn)
                 )
             except Exception as e:
-                print(f"Error in promoting admin: {e}")
+                logger.error("Error in promoting admin: %s", e)
                 await msg.reply(f"Uɴᴇxᴘᴇᴄᴛᴇᴅ Eʀʀᴏʀ: {str(e)}", reply_markup=InlineKeyboardMarkup(btn))
 
         # Remove Admin
@@ -1049,11 +1057,11 @@ async def settings_callback(client: Bot, callback_query):
                     reply_markup=InlineKeyboardMarkup(btn)
                 )
             except Exception as e:
-                print(f"Error in depromoting admin: {e}")
+                logger.error("Error in depromoting admin: %s", e)
                 await msg.reply(f"Uɴᴇxᴘᴇᴄᴛᴇᴅ Eʀʀᴏʀ: {str(e)}", reply_markup=InlineKeyboardMarkup(btn))
 
     except Exception as e:
-        print(f"Error in callback: {e}")
+        logger.error("Error in callback %s: %s", cb_data, e)
         await callback_query.message.edit_text(
             f"Unexpected Error: {str(e)}",
             reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("back", callback_data="settings_main")]])
@@ -1068,69 +1076,53 @@ async def send_channel_page(client, message, channels, page, edit=False):
     end_idx = start_idx + PAGE_SIZE
     buttons = []
     
-    print(f"\n=== CHANNEL PAGE DEBUG ===")
-    print(f"Total channels: {len(channels)}")
-    print(f"Page: {page + 1}/{total_pages}")
-    print(f"Processing channels: {channels[start_idx:end_idx]}")
+    logger.debug("Building link page %d/%d for channels %s", page + 1, total_pages, channels[start_idx:end_idx])
 
     row = []
     for channel_id in channels[start_idx:end_idx]:
         try:
-            print(f"\nProcessing channel: {channel_id}")
-            
             # First, get the chat info
             try:
-                chat = await client.get_chat(channel_id)
-                print(f"Chat found: {chat.title}")
+                chat = await get_chat_info(client, channel_id)
             except Exception as e:
-                print(f"Error getting chat {channel_id}: {e}")
+                logger.warning("Error getting chat %s: %s", channel_id, e)
                 continue
             
             # Get or create encoded link
             try:
                 base64_invite = await Seishiro.get_encoded_link(channel_id)
-                print(f"Retrieved encoded link: {base64_invite}")
             except Exception as e:
-                print(f"Error getting encoded link: {e}")
+                logger.warning("Error getting encoded link for %s: %s", channel_id, e)
                 base64_invite = None
             
             if not base64_invite:
-                print(f"No encoded link found, creating new one...")
                 try:
                     base64_invite = await encode(str(channel_id))
                     await Seishiro.save_encoded_link(channel_id, base64_invite)
-                    print(f"Created and saved new encoded link: {base64_invite}")
+                    logger.debug("Created encoded link for %s", channel_id)
                 except Exception as e:
-                    print(f"Error creating encoded link: {e}")
+                    logger.warning("Error creating encoded link for %s: %s", channel_id, e)
                     continue
             
             # Create button link
             button_link = f"https://t.me/{client.username}?start={base64_invite}"
-            print(f"Button link: {button_link}")
             
             # Add button to row
             button = InlineKeyboardButton(chat.title, url=button_link)
             row.append(button)
-            print(f"Added button for {chat.title}")
             
             # When we have 2 buttons, add the row and start a new one
             if len(row) == 2:
                 buttons.append(row)
-                print(f"Added row with 2 buttons")
                 row = []
                 
-        except Exception as e:
-            print(f"FATAL Error for channel {channel_id}: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error building link button for channel %s", channel_id)
             continue
 
     # Add remaining button if odd number of channels
     if row:
         buttons.append(row)
-        print(f"Added final row with {len(row)} button(s)")
-
-    print(f"\nTotal button rows created: {len(buttons)}")
 
     # Navigation buttons - only show if there are multiple pages
     nav_buttons = []
@@ -1154,16 +1146,13 @@ async def send_channel_page(client, message, channels, page, edit=False):
         f"<b>Pᴀɢᴇ {page + 1} ᴏғ {total_pages}</b>"
     )
     
-    print(f"Sending message with {len(buttons)} button rows")
-    
     try:
         if edit:
             await message.edit_text(message_text, reply_markup=reply_markup)
         else:
             await message.reply(message_text, reply_markup=reply_markup)
-        print("Message sent successfully!")
     except Exception as e:
-        print(f"Error sending message: {e}")
+        logger.error("Error sending link page: %s", e)
         raise
 
 
@@ -1176,69 +1165,53 @@ async def send_request_page(client, message, channels, page, edit=False):
     end_idx = start_idx + PAGE_SIZE
     buttons = []
     
-    print(f"\n=== REQUEST PAGE DEBUG ===")
-    print(f"Total channels: {len(channels)}")
-    print(f"Page: {page + 1}/{total_pages}")
-    print(f"Processing channels: {channels[start_idx:end_idx]}")
+    logger.debug("Building request link page %d/%d for channels %s", page + 1, total_pages, channels[start_idx:end_idx])
 
     row = []
     for channel_id in channels[start_idx:end_idx]:
         try:
-            print(f"\nProcessing request link for channel: {channel_id}")
-            
             # First, get the chat info
             try:
-                chat = await client.get_chat(channel_id)
-                print(f"Chat found: {chat.title}")
+                chat = await get_chat_info(client, channel_id)
             except Exception as e:
-                print(f"Error getting chat {channel_id}: {e}")
+                logger.warning("Error getting chat %s: %s", channel_id, e)
                 continue
             
             # Get or create encoded request link
             try:
                 base64_request = await Seishiro.get_encoded_link2(channel_id)
-                print(f"Retrieved encoded request link: {base64_request}")
             except Exception as e:
-                print(f"Error getting encoded request link: {e}")
+                logger.warning("Error getting encoded request link for %s: %s", channel_id, e)
                 base64_request = None
             
             if not base64_request:
-                print(f"No encoded request link found, creating new one...")
                 try:
                     base64_request = await encode(str(channel_id))
                     await Seishiro.save_encoded_link2(channel_id, base64_request)
-                    print(f"Created and saved new request link: {base64_request}")
+                    logger.debug("Created encoded request link for %s", channel_id)
                 except Exception as e:
-                    print(f"Error creating encoded request link: {e}")
+                    logger.warning("Error creating encoded request link for %s: %s", channel_id, e)
                     continue
             
             # Create button link with 'req_' prefix
             button_link = f"https://t.me/{client.username}?start=req_{base64_request}"
-            print(f"Request button link: {button_link}")
             
             # Add button to row
             button = InlineKeyboardButton(chat.title, url=button_link)
             row.append(button)
-            print(f"Added request button for {chat.title}")
             
             # When we have 2 buttons, add the row and start a new one
             if len(row) == 2:
                 buttons.append(row)
-                print(f"Added row with 2 buttons")
                 row = []
                 
-        except Exception as e:
-            print(f"FATAL Error for channel {channel_id}: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error building link button for channel %s", channel_id)
             continue
 
     # Add remaining button if odd number of channels
     if row:
         buttons.append(row)
-        print(f"Added final row with {len(row)} button(s)")
-
-    print(f"\nTotal button rows created: {len(buttons)}")
 
     # Navigation buttons - only show if there are multiple pages
     nav_buttons = []
@@ -1262,16 +1235,13 @@ async def send_request_page(client, message, channels, page, edit=False):
         f"<b>Pᴀɢᴇ {page + 1} ᴏғ {total_pages}</b>"
     )
     
-    print(f"Sending message with {len(buttons)} button rows")
-    
     try:
         if edit:
             await message.edit_text(message_text, reply_markup=reply_markup)
         else:
             await message.reply(message_text, reply_markup=reply_markup)
-        print("Message sent successfully!")
     except Exception as e:
-        print(f"Error sending message: {e}")
+        logger.error("Error sending link page: %s", e)
         raise
 
 
@@ -1288,7 +1258,7 @@ async def send_channel_ids_page(client, message, channels, page, status_msg=None
     
     for idx, channel_id in enumerate(channels[start_idx:end_idx], start=start_idx + 1):
         try:
-            chat = await client.get_chat(channel_id)
+            chat = await get_chat_info(client, channel_id)
             text += f"<b>{idx}. {chat.title}</b>\n<code>{channel_id}</code>\n\n"
         except Exception as e:
             text += f"<b>{idx}. Channel {channel_id}</b> (Error: {str(e)[:20]})\n\n"
@@ -1324,7 +1294,7 @@ async def send_channel_ids_page(client, message, channels, page, status_msg=None
             except:
                 pass
     except Exception as e:
-        print(f"Error in send_channel_ids_page: {e}")
+        logger.error("Error in send_channel_ids_page: %s", e)
         if status_msg:
             try:
                 await status_msg.delete()
@@ -1332,6 +1302,7 @@ async def send_channel_ids_page(client, message, channels, page, status_msg=None
                 pass
                 
 @Bot.on_message(filters.command('genlink') & filters.private & is_owner_or_admin)
+@track_handler
 async def gen_link_cmd(client: Bot, message: Message):
     if len(message.command) < 2:
         return await message.reply(
@@ -1349,7 +1320,7 @@ async def gen_link_cmd(client: Bot, message: Message):
                 "ᴛʜᴇɴ ʏᴏᴜ ᴡɪʟʟ ʙᴇ ᴀʙʟᴇ ᴛᴏ ᴄʀᴇᴀᴛᴇ ʟɪɴᴋs ғᴏʀ ᴛʜᴀᴛ ɪᴅ.</blockquote></b>"
             )
 
-        chat = await client.get_chat(channel_id)
+        chat = await get_chat_info(client, channel_id)
 
         # Normal link
         base64_invite = await encode(str(channel_id))
@@ -1378,6 +1349,7 @@ async def gen_link_cmd(client: Bot, message: Message):
         await message.reply(f"<b>ᴇʀʀᴏʀ:</b> <code>{str(e)}</code>")
 
 @Bot.on_message(filters.command('batch') & is_owner_or_admin)
+@track_handler
 async def batch(client: Bot, message: Message):
     if len(message.command) < 2:
         return await message.reply(
@@ -1400,7 +1372,7 @@ async def batch(client: Bot, message: Message):
                 )
                 continue
 
-            chat = await client.get_chat(channel_id)
+            chat = await get_chat_info(client, channel_id)
 
             # Normal link
             base64_invite = await encode(str(channel_id))
@@ -0,0 +1,219 @@
+import asyncio
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Deadline for the Telegram round trip of calls made in this context; time
+# spent queued in the governor does not count against it (see Bot.invoke)
+call_timeout = ContextVar("call_timeout", default=None)
+
+# Set by background bulk senders (broadcasts) so they yield send capacity
+# to interactive handlers
+bulk_traffic = ContextVar("bulk_traffic", default=False)
+
+
+@contextmanager
+def api_deadline(seconds: float):
+    """Fail Telegram calls made inside the block whose round trip exceeds `seconds`."""
+    token = call_timeout.set(seconds)
+    try:
+        yield
+    finally:
+        call_timeout.reset(token)
+
+
+class FloodHold(Exception):
+    """Raised by ApiGovernor.acquire instead of waiting out a hold longer than `max_hold_wait`."""
+
+    def __init__(self, method: str, seconds: float):
+        super().__init__(f"{method} is held for another {seconds:.0f}s after a FloodWait")
+        self.method = method
+        self.value = seconds
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, bursting up to `capacity`.
+    pause() stops every acquirer until the given delay has passed, which is
+    how a FloodWait seen by one caller backs off all of them.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError(f"rate must be greater than 0, got {rate}")
+        self.rate = rate
+        # Below one token acquire(1) could never be satisfied
+        self.capacity = max(1.0, capacity or rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    @property
+    def paused_for(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """Wait for `tokens` and return how long the caller waited."""
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return time.monotonic() - started
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class ApiGovernor:
+    """
+    Single gate for every outbound Telegram call made through Bot.invoke.
+
+    Calls that send a message wait on the global bucket; every other call
+    (reads, deletes, chat actions) waits on a separate, larger call bucket,
+    so membership checks are not queued behind outgoing messages. Calls also
+    wait on their method's bucket (if the method has a configured rate) and
+    sends also wait on a per-chat bucket, since Telegram limits new messages
+    per destination chat. Sends made under bulk_traffic first take a token
+    from the bulk bucket, which caps broadcasts at `bulk_rate` of the global
+    budget.
+
+    A FloodWait places a temporary hold on the offending method, or for sends
+    on the method in that chat only, for its full duration, and pauses every
+    method for at most `flood_global_pause` seconds, so one hot path backs
+    everybody off briefly without taking /start down for minutes. Callers
+    facing a hold longer than `max_hold_wait` get FloodHold instead of
+    queueing behind it.
+    """
+
+    # Methods that put a message in a chat, limited bot-wide and per chat by Telegram
+    SEND_METHODS = {"SendMessage", "SendMedia", "SendMultiMedia", "ForwardMessages"}
+
+    def __init__(self, global_rate: float, method_rates: dict, chat_rate: float, chat_burst: float,
+                 call_rate: float = None, bulk_rate: float = None,
+                 flood_global_pause: float = 5, max_chat_buckets: int = 10000,
+                 max_hold_wait: float = None):
+        self.global_bucket = TokenBucket(global_rate)
+        self.call_bucket = TokenBucket(call_rate or global_rate)
+        self.bulk_bucket = TokenBucket(bulk_rate or global_rate)
+        self.method_rates = method_rates
+        self.method_buckets = {}
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chat_buckets = OrderedDict()
+        self.max_chat_buckets = max_chat_buckets
+        self.flood_global_pause = flood_global_pause
+        self.max_hold_wait = max_hold_wait
+        self._holds = {}
+        self.calls = defaultdict(int)
+        self.wait_seconds = defaultdict(float)
+        self.max_wait = defaultdict(float)
+        self.flood_waits = defaultdict(int)
+        self.flood_wait_seconds = defaultdict(float)
+
+    def _method_bucket(self, method: str):
+        bucket = self.method_buckets.get(method)
+        if bucket is None and method in self.method_rates:
+            bucket = self.method_buckets[method] = TokenBucket(self.method_rates[method])
+        return bucket
+
+    def _chat_bucket(self, chat_key) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_key)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_key] = TokenBucket(self.chat_rate, self.chat_burst)
+            while len(self.chat_buckets) > self.max_chat_buckets:
+                self.chat_buckets.popitem(last=False)
+        self.chat_buckets.move_to_end(chat_key)
+        return bucket
+
+    def _hold_key(self, method: str, chat_key):
+        # Send FloodWaits are usually about one peer, so hold only that chat
+        if chat_key is not None and method in self.SEND_METHODS:
+            return method, chat_key
+        return method
+
+    def held_for(self, method: str, chat_key=None) -> float:
+        """Seconds left on the FloodWait hold covering `method` in `chat_key`."""
+        key = self._hold_key(method, chat_key)
+        until = self._holds.get(key)
+        if until is None:
+            return 0.0
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            del self._holds[key]
+            return 0.0
+        return remaining
+
+    async def acquire(self, method: str, chat_key=None) -> float:
+        """Wait for permission to call `method`; returns the time spent queued."""
+        waited = 0.0
+        held = self.held_for(method, chat_key)
+        if held:
+            if self.max_hold_wait is not None and held > self.max_hold_wait:
+                raise FloodHold(method, held)
+            await asyncio.sleep(held)
+            waited += held
+        bucket = self._method_bucket(method)
+        if bucket:
+            waited += await bucket.acquire()
+        if chat_key is not None and method in self.SEND_METHODS:
+            waited += await self._chat_bucket(chat_key).acquire()
+        if method in self.SEND_METHODS:
+            if bulk_traffic.get():
+                waited += await self.bulk_bucket.acquire()
+            waited += await self.global_bucket.acquire()
+        else:
+            waited += await self.call_bucket.acquire()
+        self.calls[method] += 1
+        self.wait_seconds[method] += waited
+        self.max_wait[method] = max(self.max_wait[method], waited)
+        return waited
+
+    def on_flood_wait(self, method: str, seconds: float, chat_key=None):
+        self.flood_waits[method] += 1
+        self.flood_wait_seconds[method] += seconds
+        now = time.monotonic()
+        for key in [key for key, until in self._holds.items() if until <= now]:
+            del self._holds[key]
+        key = self._hold_key(method, chat_key)
+        self._holds[key] = max(self._holds.get(key, 0.0), now + seconds)
+        self.global_bucket.pause(min(seconds, self.flood_global_pause))
+        self.call_bucket.pause(min(seconds, self.flood_global_pause))
+
+    @property
+    def total_wait(self) -> float:
+        return sum(self.wait_seconds.values())
+
+    def stats(self) -> dict:
+        """Per-method call, queue wait and FloodWait counters."""
+        return {
+            method: {
+                "calls": self.calls[method],
+                "wait_seconds": self.wait_seconds[method],
+                "max_wait": self.max_wait[method],
+                "flood_waits": self.flood_waits[method],
+                "flood_wait_seconds": self.flood_wait_seconds[method],
+            }
+            for method in set(self.calls) | set(self.flood_waits)
+        }
+
+
+def parse_rates(spec: str) -> dict:
+    """Parse 'Method:rate,Method:rate' into {'Method': rate}."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        method, _, rate = item.partition(":")
+        rate = float(rate)
+        if rate <= 0:
+            raise ValueError(f"rate for {method.strip()} must be greater than 0, got {rate}")
+        rates[method.strip()] = rate
+    return rates